@@ -0,0 +1 @@
+"""Нагрузочные тесты и заглушки внешних API."""
@@ -0,0 +1,144 @@
+"""Нагрузочный тест движка опроса на локальных заглушках.
+
+Запуск из корня репозитория:
+    python -m benchmarks.load --subscriptions 1000 --duration 30
+"""
+import argparse
+import asyncio
+import logging
+import time
+import tracemalloc
+
+from telegram import Bot
+from telegram.utils.request import Request
+
+import homework
+from benchmarks.stubs import PracticumStub, TelegramStub, percentile
+from engine import PollingEngine, Subscription
+from http_client import create_session
+from outbox import Outbox
+from response_cache import CACHE_RESULTS, ResponseCache
+from scheduler import AdaptiveScheduler
+from state import MemoryStateStore
+
+STUB_TELEGRAM_TOKEN = '123456:stub'
+
+
+def parse_args() -> argparse.Namespace:
+    """Параметры нагрузочного теста."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscriptions', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--min-interval', type=float, default=1)
+    parser.add_argument('--max-interval', type=float, default=5)
+    parser.add_argument('--api-latency', type=float, default=0.05)
+    parser.add_argument('--api-error-rate', type=float, default=0)
+    parser.add_argument('--churn', type=float, default=0.1)
+    parser.add_argument('--telegram-latency', type=float, default=0.02)
+    parser.add_argument(
+        '--conditional', action='store_true',
+        help='кэш ответов и ETag на заглушке Практикума'
+    )
+    parser.add_argument(
+        '--no-memory', action='store_true',
+        help='не измерять память через tracemalloc'
+    )
+    return parser.parse_args()
+
+
+def token_name(number: int) -> str:
+    """Токен Практикума для подписки с номером number."""
+    return f'token{number}'
+
+
+def build_engine(args, telegram: TelegramStub) -> PollingEngine:
+    """Движок с интервалами и лимитами, подходящими для теста."""
+    bot = Bot(
+        STUB_TELEGRAM_TOKEN,
+        base_url=telegram.base_url,
+        request=Request(con_pool_size=args.concurrency)
+    )
+    subscriptions = [
+        Subscription(token_name(number), number)
+        for number in range(args.subscriptions)
+    ]
+    engine = PollingEngine(
+        bot, subscriptions,
+        concurrency=args.concurrency,
+        store=MemoryStateStore()
+    )
+    engine.scheduler = AdaptiveScheduler(
+        min_interval=args.min_interval,
+        max_interval=args.max_interval,
+        initial_interval=args.min_interval
+    )
+    engine.outbox = Outbox(
+        engine.send_now,
+        global_rate=1e9,
+        chat_rate=1e9,
+        chat_burst=1e9,
+        concurrency=args.concurrency
+    )
+    return engine
+
+
+async def run_for(engine: PollingEngine, duration: float) -> None:
+    """Работа движка в течение duration секунд."""
+    try:
+        await asyncio.wait_for(engine.run(), duration)
+    except asyncio.TimeoutError:
+        pass
+
+
+def main():
+    """Запуск теста и печать отчета."""
+    args = parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+    practicum = PracticumStub(
+        latency=args.api_latency,
+        error_rate=args.api_error_rate,
+        churn=args.churn,
+        etags=args.conditional
+    ).start()
+    telegram = TelegramStub(latency=args.telegram_latency).start()
+    homework.ENDPOINT = practicum.endpoint
+    homework.set_http_session(create_session(pool_size=args.concurrency))
+    if args.conditional:
+        homework.set_response_cache(ResponseCache())
+    practicum.prepare(token_name(n) for n in range(args.subscriptions))
+    try:
+        if not args.no_memory:
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+        engine = build_engine(args, telegram)
+        started = time.monotonic()
+        asyncio.run(run_for(engine, args.duration))
+        elapsed = time.monotonic() - started
+        if not args.no_memory:
+            memory = tracemalloc.get_traced_memory()[0] - baseline
+            tracemalloc.stop()
+    finally:
+        practicum.stop()
+        telegram.stop()
+
+    latencies = telegram.latencies(practicum)
+    print(f'subscriptions:        {args.subscriptions}')
+    print(f'polls/sec:            {practicum.requests / elapsed:.1f}')
+    print(f'messages sent:        {len(telegram.messages)}')
+    print(f'status changes:       {sum(map(len, practicum.changes.values()))}')
+    for name, fraction in (('p50', 0.5), ('p99', 0.99)):
+        value = percentile(latencies, fraction)
+        value = 'n/a' if value is None else f'{value * 1000:.0f} ms'
+        print(f'{name} notify latency:   {value}')
+    if args.conditional:
+        for (result,), count in sorted(CACHE_RESULTS.values().items()):
+            print(f'cache {result + ":":14}{count:.0f}')
+    if not args.no_memory:
+        print(f'memory/subscription:  {memory / args.subscriptions:.0f} B')
+        print('(memory includes the executor threads and message history '
+              'of the in-process stubs)')
+
+
+if __name__ == '__main__':
+    main()
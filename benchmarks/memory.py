@@ -0,0 +1,100 @@
+"""Память на подписку: словари ответа API против компактных записей.
+
+Запуск из корня репозитория:
+    python -m benchmarks.memory --subscriptions 10000 --homeworks 10
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+from types import SimpleNamespace
+from typing import Callable, List
+
+from decoder import loads, parse_answer
+from engine import Subscription
+
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+def parse_args() -> argparse.Namespace:
+    """Параметры теста."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscriptions', type=int, default=10000)
+    parser.add_argument('--homeworks', type=int, default=10)
+    return parser.parse_args()
+
+
+def answer_body(number: int, homeworks: int) -> bytes:
+    """Тело ответа API с homeworks работами."""
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': index,
+                'homework_name': f'student{number}__hw{index:02}.zip',
+                'status': STATUSES[(number + index) % len(STATUSES)],
+                'reviewer_comment': 'Принято.',
+                'date_updated': '2022-01-01T00:00:00Z',
+                'lesson_name': f'Спринт {index}',
+            }
+            for index in range(homeworks)
+        ],
+        'current_date': 1640995200,
+    }, ensure_ascii=False).encode()
+
+
+def dict_form(number: int, body: bytes) -> object:
+    """Подписка с __dict__, разобранный ответ и индекс статусов."""
+    answer = loads(body)
+    subscription = SimpleNamespace(
+        token=f'token{number}',
+        chat_id=number,
+        id=f'{number}:0123456789abcdef',
+        token_key='0123456789abcdef',
+        from_date=1640995200,
+        previous_message='',
+    )
+    statuses = {
+        homework['homework_name']: homework['status']
+        for homework in answer['homeworks']
+    }
+    return subscription, answer, statuses
+
+
+def compact_form(number: int, body: bytes) -> object:
+    """Подписка и записи ДЗ со __slots__, статусы из перечисления."""
+    answer = parse_answer(body)
+    subscription = Subscription(f'token{number}', number)
+    statuses = {record.name: record.status for record in answer.homeworks}
+    return subscription, answer, statuses
+
+
+def measure(build: Callable[[int, bytes], object], bodies: List[bytes]) -> int:
+    """Прирост памяти после построения состояния всех подписок."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    kept = [build(number, body) for number, body in enumerate(bodies)]
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del kept
+    return used
+
+
+def main():
+    """Запуск теста и печать отчета."""
+    args = parse_args()
+    bodies = [
+        answer_body(number, args.homeworks)
+        for number in range(args.subscriptions)
+    ]
+    dict_bytes = measure(dict_form, bodies) / args.subscriptions
+    compact_bytes = measure(compact_form, bodies) / args.subscriptions
+    print(f'subscriptions:        {args.subscriptions}')
+    print(f'homeworks each:       {args.homeworks}')
+    print(f'dict form:            {dict_bytes:.0f} B/subscription')
+    print(f'compact form:         {compact_bytes:.0f} B/subscription')
+    print(f'saved:                {1 - compact_bytes / dict_bytes:.0%}')
+
+
+if __name__ == '__main__':
+    main()
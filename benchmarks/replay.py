@@ -0,0 +1,309 @@
+"""Запись ответов API Практикума и их воспроизведение через конвейер.
+
+Запись опрашивает API по токенам подписок и сохраняет ответы в корпус
+JSONL, токены заменяются отпечатками. Воспроизведение прогоняет корпус
+через разбор, проверку ответа, поиск изменений и сборку сообщений без
+сети и Telegram и печатает скорость и выделение памяти по этапам.
+
+Запуск из корня репозитория:
+    python -m benchmarks.replay record corpus.jsonl.gz --cycles 6
+    python -m benchmarks.replay replay corpus.jsonl.gz --repeat 20
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import time
+import tracemalloc
+from typing import (
+    IO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+)
+
+import homework
+from decoder import decode_answer, loads
+from state import token_digest
+
+REDACTED = '<token>'
+STAGES = ('decode', 'check', 'diff', 'render')
+# До Python 3.9 пик не сбрасывается, учитывается только прирост памяти.
+RESET_PEAK = getattr(tracemalloc, 'reset_peak', None)
+
+logger = logging.getLogger(__name__)
+
+
+def open_corpus(path: str, mode: str) -> IO[str]:
+    """Текстовый файл корпуса, сжатый gzip при расширении .gz."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class Recorder:
+    """Запись ответов API в корпус JSONL без токенов."""
+
+    def __init__(self, path: str) -> None:
+        """Открытие корпуса path для записи."""
+        self.file = open_corpus(path, 'w')
+        self.records = 0
+
+    def record(self, token: str, from_date: int, answer: object) -> None:
+        """Запись одного ответа API на запрос с отметкой from_date."""
+        line = json.dumps(
+            {
+                'token': token_digest(token),
+                'from_date': from_date,
+                'answer': answer,
+            },
+            ensure_ascii=False,
+            separators=(',', ':')
+        )
+        if token:
+            line = line.replace(token, REDACTED)
+        self.file.write(line + '\n')
+        self.records += 1
+
+    def close(self) -> None:
+        """Закрытие файла корпуса."""
+        self.file.close()
+
+    def __enter__(self) -> 'Recorder':
+        """Запись в контексте with."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Закрытие файла корпуса."""
+        self.close()
+
+
+def record_tokens(
+    recorder: Recorder,
+    tokens: List[str],
+    cycles: int,
+    interval: float,
+    from_date: int = 0
+) -> None:
+    """Опрос API по токенам cycles раз с паузой interval секунд.
+
+    Отметка опроса каждого токена сдвигается так же, как в боте, поэтому
+    корпус повторяет настоящую историю ответов.
+    """
+    cursors = dict.fromkeys(tokens, from_date)
+    for cycle in range(cycles):
+        if cycle:
+            time.sleep(interval)
+        for token, cursor in cursors.items():
+            try:
+                answer = homework.request_homework_statuses(token, cursor)
+            except Exception as error:
+                logger.warning(
+                    'Ответ для %s не записан: %s', token_digest(token), error
+                )
+                continue
+            recorder.record(token, cursor, answer)
+            if isinstance(answer, dict):
+                cursors[token] = homework.next_from_date(answer, cursor)
+        logger.info('Цикл записи %s, ответов: %s', cycle + 1, recorder.records)
+
+
+class Pipeline(NamedTuple):
+    """Этапы конвейера после разбора JSON."""
+
+    check: Callable[[object], list]
+    diff: Callable[[list, dict], list]
+    render: Callable[[object], str]
+    key: Callable[[object], Tuple[str, object]]
+
+
+PIPELINES = {
+    'dict': Pipeline(
+        check=homework.check_response,
+        diff=homework.diff_statuses,
+        render=homework.parse_status,
+        key=lambda item: (item['homework_name'], item['status'])
+    ),
+    'compact': Pipeline(
+        check=lambda answer: decode_answer(answer).homeworks,
+        diff=homework.diff_records,
+        render=lambda event: homework.format_status(
+            event.homework.name, event.homework.status
+        ),
+        key=lambda event: (event.homework.name, event.homework.status)
+    ),
+}
+
+
+class StageStats:
+    """Счетчики одного этапа конвейера."""
+
+    __slots__ = ('name', 'items', 'seconds', 'allocated')
+
+    def __init__(self, name: str) -> None:
+        """Пустые счетчики этапа name."""
+        self.name = name
+        self.items = 0
+        self.seconds = 0.0
+        self.allocated = 0
+
+
+class Replay:
+    """Прогон корпуса через конвейер с замером этапов.
+
+    Индекс статусов ведется по отпечатку токена, как в хранилище бота.
+    Исключения этапов считаются сбоями цикла и не прерывают прогон.
+    """
+
+    def __init__(self, pipeline: Pipeline, allocations: bool = False) -> None:
+        """Прогон через pipeline, с allocations - с замером памяти."""
+        self.pipeline = pipeline
+        self.allocations = allocations
+        self.stages = {name: StageStats(name) for name in STAGES}
+        self.statuses: Dict[str, dict] = {}
+        self.messages = 0
+        self.errors = 0
+
+    def measure(self, name: str, function: Callable, *args) -> object:
+        """Вызов function с учетом времени и памяти этапа name."""
+        stats = self.stages[name]
+        if self.allocations:
+            if RESET_PEAK is not None:
+                RESET_PEAK()
+            before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            stats.seconds += time.perf_counter() - started
+            stats.items += 1
+            if self.allocations:
+                current, peak = tracemalloc.get_traced_memory()
+                if RESET_PEAK is None:
+                    peak = current
+                stats.allocated += max(peak - before, 0)
+
+    def feed(self, line: str) -> None:
+        """Прогон одной строки корпуса."""
+        pipeline = self.pipeline
+        try:
+            record = self.measure('decode', loads, line)
+            items = self.measure('check', pipeline.check, record['answer'])
+            statuses = self.statuses.setdefault(record['token'], {})
+            changed = self.measure('diff', pipeline.diff, items, statuses)
+            for item in changed:
+                self.measure('render', pipeline.render, item)
+                name, status = pipeline.key(item)
+                statuses[name] = status
+                self.messages += 1
+        except Exception:
+            self.errors += 1
+
+    def run(self, lines: Iterable[str]) -> None:
+        """Прогон всех строк корпуса с чистым индексом статусов."""
+        self.statuses = {}
+        for line in lines:
+            self.feed(line)
+
+
+def read_corpus(path: str) -> Iterator[str]:
+    """Строки корпуса без пустых строк."""
+    with open_corpus(path, 'r') as file:
+        for line in file:
+            if line.strip():
+                yield line
+
+
+def replay(
+    path: str,
+    pipeline: str = 'dict',
+    repeat: int = 1,
+    allocations: bool = False
+) -> Replay:
+    """Прогон корпуса repeat раз, с замером памяти отдельным проходом."""
+    driver = Replay(PIPELINES[pipeline])
+    for _ in range(repeat):
+        driver.run(read_corpus(path))
+    if allocations:
+        traced = Replay(PIPELINES[pipeline], allocations=True)
+        tracemalloc.start()
+        try:
+            traced.run(read_corpus(path))
+        finally:
+            tracemalloc.stop()
+        for name, stats in traced.stages.items():
+            driver.stages[name].allocated = stats.allocated * repeat
+    return driver
+
+
+def report(driver: Replay) -> None:
+    """Печать отчета по этапам."""
+    print(f'messages:             {driver.messages}')
+    print(f'errors:               {driver.errors}')
+    print(f'{"stage":10}{"items":>10}{"items/s":>12}{"us/item":>10}'
+          f'{"B/item":>10}')
+    for stats in driver.stages.values():
+        if not stats.items:
+            continue
+        rate = stats.items / stats.seconds if stats.seconds else 0
+        print(
+            f'{stats.name:10}{stats.items:>10}{rate:>12.0f}'
+            f'{stats.seconds / stats.items * 1e6:>10.2f}'
+            f'{stats.allocated / stats.items:>10.0f}'
+        )
+
+
+def recording_tokens(path: Optional[str]) -> List[str]:
+    """Токены из файла подписок или PRACT_TOKEN из окружения."""
+    from subscriptions import SUBSCRIPTIONS_FILE, load_subscriptions
+
+    path = path or SUBSCRIPTIONS_FILE
+    if os.path.exists(path):
+        return sorted({sub.token for sub in load_subscriptions(path)})
+    return [homework.PRACTICUM_TOKEN] if homework.PRACTICUM_TOKEN else []
+
+
+def parse_args() -> argparse.Namespace:
+    """Параметры записи и воспроизведения."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help='записать ответы API')
+    record.add_argument('corpus')
+    record.add_argument('--subscriptions', help='файл подписок с токенами')
+    record.add_argument('--cycles', type=int, default=1)
+    record.add_argument('--interval', type=float, default=homework.RETRY_TIME)
+    record.add_argument('--from-date', type=int, default=0)
+    play = commands.add_parser('replay', help='прогнать корпус')
+    play.add_argument('corpus')
+    play.add_argument('--pipeline', choices=sorted(PIPELINES), default='dict')
+    play.add_argument('--repeat', type=int, default=1)
+    play.add_argument(
+        '--no-memory', action='store_true',
+        help='не измерять память через tracemalloc'
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Запись корпуса или прогон с печатью отчета."""
+    args = parse_args()
+    if args.command == 'replay':
+        report(replay(
+            args.corpus, args.pipeline, args.repeat, not args.no_memory
+        ))
+        return
+    from http_client import create_session
+
+    logging.basicConfig(level=logging.INFO)
+    homework.init_config()
+    homework.set_http_session(create_session())
+    tokens = recording_tokens(args.subscriptions)
+    if not tokens:
+        raise SystemExit('Нет токенов для записи')
+    with Recorder(args.corpus) as recorder:
+        record_tokens(
+            recorder, tokens, args.cycles, args.interval, args.from_date
+        )
+    print(f'recorded:             {recorder.records}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Время холодного импорта модулей по `python -X importtime`.
+
+Запуск из корня репозитория:
+    python -m benchmarks.startup --runs 5 --max-ms 150
+
+Код выхода 1, если модуль импортирует тяжелые зависимости, которые
+должны загружаться лениво, или медиана превышает --max-ms.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = {
+    'homework': ('telegram', 'requests', 'dotenv'),
+    'engine': ('telegram', 'dotenv'),
+}
+ENV_SAMPLE = 'PRACT_TOKEN=token\nCLOCK_SKEW=60\n'
+IMPORTTIME_LINE = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$'
+)
+
+
+def import_profile(module: str) -> Dict[str, int]:
+    """Суммарное время импорта каждого модуля верхнего уровня, мкс.
+
+    Импорт измеряется с непустым .env: сам импорт не должен его читать.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        env_file = os.path.join(directory, '.env')
+        with open(env_file, 'w', encoding='utf-8') as file:
+            file.write(ENV_SAMPLE)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=ROOT,
+            env={**os.environ, 'ENV_FILE': env_file},
+            stderr=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            universal_newlines=True,
+            check=True
+        )
+    profile = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            _, cumulative, _, name = match.groups()
+            profile[name] = int(cumulative)
+    return profile
+
+
+def check_module(module: str, runs: int) -> Tuple[float, List[str]]:
+    """Медиана времени импорта в мс и загруженные тяжелые зависимости."""
+    timings = []
+    eager = set()
+    for _ in range(runs):
+        profile = import_profile(module)
+        timings.append(profile[module] / 1000)
+        eager.update(
+            name for name in LAZY_MODULES.get(module, ())
+            if name in profile
+        )
+    return statistics.median(timings), sorted(eager)
+
+
+def main():
+    """Запуск теста и печать отчета."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=list(LAZY_MODULES))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=0)
+    args = parser.parse_args()
+    failed = False
+    for module in args.modules:
+        median, eager = check_module(module, args.runs)
+        print(f'{module + ":":22}{median:.1f} ms')
+        if eager:
+            failed = True
+            print(f'  eager imports:      {", ".join(eager)}')
+        if args.max_ms and median > args.max_ms:
+            failed = True
+            print(f'  slower than {args.max_ms:.0f} ms')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""Локальные заглушки API Практикума и Telegram Bot API."""
+import bisect
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+STATUS_CYCLE = {
+    'reviewing': 'rejected',
+    'rejected': 'reviewing',
+}
+QUOTED_NAME = re.compile(r'"([^"]+)"')
+
+
+class StubServer:
+    """HTTP сервер заглушки в фоновом потоке."""
+
+    def __init__(self, handler_class: type, latency: float = 0) -> None:
+        """Сервер на свободном порту localhost с задержкой ответа."""
+        self.latency = latency
+        handler = type(handler_class.__name__, (handler_class,), {
+            'stub': self
+        })
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def url(self) -> str:
+        """Базовый адрес сервера."""
+        host, port = self.server.server_address
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'StubServer':
+        """Запуск сервера."""
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Остановка сервера."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> 'StubServer':
+        """Запуск сервера в контексте with."""
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        """Остановка сервера."""
+        self.stop()
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    """Обработчик с ответом в JSON и искусственной задержкой."""
+
+    stub = None
+
+    def log_message(self, format, *args):
+        """Журнал запросов заглушки не ведется."""
+
+    def respond(
+        self, status: int, data: object, etag: Optional[str] = None
+    ) -> None:
+        """Отправка JSON ответа после задержки заглушки.
+
+        Если etag совпадает с If-None-Match запроса, тело не отправляется.
+        """
+        if self.stub.latency:
+            time.sleep(self.stub.latency)
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        body = json.dumps(data, ensure_ascii=False).encode()
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class PracticumHandler(JSONHandler):
+    """GET /api/user_api/homework_statuses/?from_date=..."""
+
+    def do_GET(self):
+        """Ответ со статусами ДЗ, обновленными после from_date."""
+        stub = self.stub
+        with stub.lock:
+            stub.requests += 1
+        if random.random() < stub.error_rate:
+            self.respond(HTTPStatus.INTERNAL_SERVER_ERROR, {})
+            return
+        token = self.headers.get('Authorization', '').replace('OAuth ', '')
+        query = parse_qs(urlparse(self.path).query)
+        from_date = int(float(query.get('from_date', ['0'])[0]))
+        homeworks = stub.homeworks_since(token, from_date)
+        etag = None
+        if stub.etags:
+            etag = '"{}"'.format(hashlib.md5(json.dumps(
+                homeworks, sort_keys=True
+            ).encode()).hexdigest())
+        self.respond(HTTPStatus.OK, {
+            'homeworks': homeworks,
+            'current_date': int(time.time()),
+        }, etag)
+
+
+class PracticumStub(StubServer):
+    """Заглушка API Практикума со сменой статусов ДЗ.
+
+    На каждый запрос с вероятностью churn меняется статус одной из работ
+    токена. Время смены запоминается для расчета задержки уведомления.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0,
+        error_rate: float = 0,
+        churn: float = 0.1,
+        homeworks_per_token: int = 3,
+        etags: bool = False
+    ) -> None:
+        """Заглушка API Практикума с параметрами нагрузки."""
+        super().__init__(PracticumHandler, latency)
+        self.error_rate = error_rate
+        self.etags = etags
+        self.churn = churn
+        self.homeworks_per_token = homeworks_per_token
+        self.homeworks: Dict[str, List[dict]] = {}
+        self.changes: Dict[str, List[float]] = defaultdict(list)
+
+    @property
+    def endpoint(self) -> str:
+        """Адрес эндпойнта для homework.ENDPOINT."""
+        return f'{self.url}/api/user_api/homework_statuses/'
+
+    def _token_homeworks(self, token: str) -> List[dict]:
+        homeworks = self.homeworks.get(token)
+        if homeworks is None:
+            homeworks = [
+                {
+                    'id': number,
+                    'homework_name': f'{token}-hw{number}',
+                    'status': 'reviewing',
+                    'updated': 0,
+                }
+                for number in range(self.homeworks_per_token)
+            ]
+            self.homeworks[token] = homeworks
+        return homeworks
+
+    def prepare(self, tokens) -> None:
+        """Заранее создать работы токенов, чтобы не учитывать их память."""
+        with self.lock:
+            for token in tokens:
+                self._token_homeworks(token)
+
+    def homeworks_since(self, token: str, from_date: int) -> List[dict]:
+        """Работы токена, обновленные не раньше from_date."""
+        now = time.time()
+        with self.lock:
+            homeworks = self._token_homeworks(token)
+            if random.random() < self.churn:
+                homework = random.choice(homeworks)
+                homework['status'] = STATUS_CYCLE.get(
+                    homework['status'], 'reviewing'
+                )
+                homework['updated'] = now
+                self.changes[homework['homework_name']].append(now)
+            return [
+                {
+                    'id': homework['id'],
+                    'homework_name': homework['homework_name'],
+                    'status': homework['status'],
+                }
+                for homework in homeworks
+                if homework['updated'] >= from_date
+            ]
+
+
+class TelegramHandler(JSONHandler):
+    """POST /bot<token>/<method> в формате Telegram Bot API."""
+
+    def do_POST(self):
+        """Прием sendMessage, прочие методы отвечают ok."""
+        stub = self.stub
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length) or b'{}')
+        received = time.time()
+        with stub.lock:
+            stub.requests += 1
+            if self.path.endswith('/sendMessage'):
+                stub.messages.append((data['chat_id'], data['text'], received))
+        self.respond(HTTPStatus.OK, {'ok': True, 'result': {
+            'message_id': stub.requests,
+            'date': int(received),
+            'chat': {'id': data.get('chat_id', 0), 'type': 'private'},
+            'text': data.get('text', ''),
+        }})
+
+
+class TelegramStub(StubServer):
+    """Заглушка Telegram Bot API, запоминающая отправленные сообщения."""
+
+    def __init__(self, latency: float = 0) -> None:
+        """Заглушка Bot API, записывающая принятые сообщения."""
+        super().__init__(TelegramHandler, latency)
+        self.messages: List[Tuple[int, str, float]] = []
+
+    @property
+    def base_url(self) -> str:
+        """Адрес для параметра base_url у telegram.Bot."""
+        return f'{self.url}/bot'
+
+    def latencies(self, practicum: PracticumStub) -> List[float]:
+        """Задержки от первой неотправленной смены статуса до уведомления."""
+        result = []
+        notified: Dict[str, int] = defaultdict(int)
+        for _, text, received in self.messages:
+            for homework_name in QUOTED_NAME.findall(text):
+                changes = practicum.changes.get(homework_name, [])
+                position = notified[homework_name]
+                if position < len(changes) and changes[position] <= received:
+                    result.append(received - changes[position])
+                    notified[homework_name] = bisect.bisect_right(
+                        changes, received
+                    )
+        return result
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Перцентиль по отсортированной выборке."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
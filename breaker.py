@@ -0,0 +1,96 @@
+"""Автоматический выключатель для общего эндпойнта API."""
+import logging
+import random
+import time
+from typing import Callable
+
+import config
+
+BREAKER_FAILURE_THRESHOLD = int(config.getenv('BREAKER_FAILURE_THRESHOLD', 5))
+BREAKER_BASE_TIMEOUT = float(config.getenv('BREAKER_BASE_TIMEOUT', 30))
+BREAKER_MAX_TIMEOUT = float(config.getenv('BREAKER_MAX_TIMEOUT', 900))
+BREAKER_JITTER = float(config.getenv('BREAKER_JITTER', 0.2))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Выключатель с пробным запросом и экспоненциальной задержкой.
+
+    После failure_threshold ошибок подряд выключатель размыкается,
+    и запросы не выполняются. По истечении задержки пропускается один
+    пробный запрос: успех замыкает выключатель, ошибка снова размыкает
+    его с удвоенной задержкой (не больше max_timeout, со случайным
+    разбросом jitter).
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        base_timeout: float = BREAKER_BASE_TIMEOUT,
+        max_timeout: float = BREAKER_MAX_TIMEOUT,
+        jitter: float = BREAKER_JITTER,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """Замкнутый выключатель с порогом и задержками проб."""
+        self.failure_threshold = failure_threshold
+        self.base_timeout = base_timeout
+        self.max_timeout = max_timeout
+        self.jitter = jitter
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.retry_at = 0.0
+
+    def allow(self) -> bool:
+        """Можно ли выполнить запрос сейчас."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.clock() >= self.retry_at:
+            self.state = HALF_OPEN
+            logger.info('Пробный запрос к эндпойнту после сбоя.')
+            return True
+        return False
+
+    def retry_in(self) -> float:
+        """Секунд до следующего пробного запроса."""
+        if self.state == CLOSED:
+            return 0
+        return max(self.retry_at - self.clock(), 0)
+
+    def record_success(self) -> bool:
+        """Учет успешного ответа, True - если выключатель замкнулся."""
+        if self.state == HALF_OPEN:
+            logger.info('Эндпойнт снова доступен.')
+            self.state = CLOSED
+            self.failures = 0
+            self.trips = 0
+            return True
+        if self.state == CLOSED:
+            self.failures = 0
+        return False
+
+    def record_failure(self) -> bool:
+        """Учет ошибки, True - если выключатель только что разомкнулся."""
+        if self.state == OPEN:
+            return False
+        self.failures += 1
+        if self.state == CLOSED and self.failures < self.failure_threshold:
+            return False
+        opened = self.state == CLOSED
+        self.trips += 1
+        timeout = min(
+            self.base_timeout * 2 ** (self.trips - 1), self.max_timeout
+        )
+        timeout *= 1 + random.uniform(-self.jitter, self.jitter)
+        self.state = OPEN
+        self.retry_at = self.clock() + timeout
+        logger.warning(
+            'Эндпойнт недоступен, опрос приостановлен на %.0f с.', timeout
+        )
+        return opened
@@ -0,0 +1,49 @@
+"""Объединение одновременных одинаковых запросов (singleflight)."""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+import metrics
+
+COALESCED = metrics.counter(
+    'coalesced_requests_total',
+    'Запросы к API, присоединенные к уже выполняющемуся.'
+)
+
+Result = TypeVar('Result')
+
+
+class SingleFlight:
+    """Один запрос на ключ: остальные вызовы ждут его результата.
+
+    Результат или исключение получают все ожидающие. Отмена одного
+    ожидающего не отменяет общий запрос.
+    """
+
+    def __init__(self) -> None:
+        """Пустой набор выполняемых вызовов."""
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        """Число выполняемых вызовов."""
+        return len(self._calls)
+
+    async def do(
+        self, key: Hashable, factory: Callable[[], Awaitable[Result]]
+    ) -> Result:
+        """Выполнение factory() или присоединение к выполняющемуся."""
+        future = self._calls.get(key)
+        if future is not None:
+            COALESCED.inc()
+        else:
+            future = asyncio.ensure_future(factory())
+            self._calls[key] = future
+            future.add_done_callback(
+                lambda done: self._forget(key, done)
+            )
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            future.exception()
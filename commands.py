@@ -0,0 +1,103 @@
+"""Обработка команд пользователей через dispatcher python-telegram-bot."""
+import logging
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional
+
+import config
+from state import StateStore
+from templates import TEMPLATES
+
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import CallbackContext, Updater
+
+BOT_UPDATES = config.getenv('BOT_UPDATES', '')
+BOT_WEBHOOK_URL = config.getenv('BOT_WEBHOOK_URL', '')
+BOT_WEBHOOK_LISTEN = config.getenv('BOT_WEBHOOK_LISTEN', '0.0.0.0')
+BOT_WEBHOOK_PORT = int(config.getenv('PORT', 8443))
+
+NOT_SUBSCRIBED_MESSAGE = 'Чат не подписан на статусы домашних работ.'
+NO_STATUSES_MESSAGE = 'Статусы домашних работ пока неизвестны.'
+
+SubscriptionLookup = Callable[[int], Iterable[str]]
+LocaleLookup = Callable[[int], Optional[str]]
+
+logger = logging.getLogger(__name__)
+
+
+def format_statuses(
+    statuses: Dict[str, str], locale: Optional[str] = None
+) -> str:
+    """Сводка последних известных статусов ДЗ на языке чата."""
+    if not statuses:
+        return NO_STATUSES_MESSAGE
+    return '\n'.join(
+        f'"{homework_name}": {TEMPLATES.verdict(status, locale)}'
+        for homework_name, status in sorted(statuses.items())
+    )
+
+
+class StatusCommand:
+    """Ответ на /status из хранилища состояния без запроса к API."""
+
+    def __init__(
+        self,
+        store: StateStore,
+        lookup: SubscriptionLookup,
+        locales: Optional[LocaleLookup] = None
+    ) -> None:
+        """Команда со статусами из store и поиском подписок чата."""
+        self.store = store
+        self.lookup = lookup
+        self.locales = locales
+
+    def reply(self, chat_id: int) -> str:
+        """Текст ответа для чата."""
+        sub_ids = list(self.lookup(chat_id))
+        if not sub_ids:
+            return NOT_SUBSCRIBED_MESSAGE
+        statuses = {}
+        for sub_id in sub_ids:
+            statuses.update(self.store.read_statuses(sub_id))
+        locale = self.locales(chat_id) if self.locales else None
+        return format_statuses(statuses, locale)
+
+    def __call__(
+        self, update: 'Update', context: 'CallbackContext'
+    ) -> None:
+        """Обработчик команды /status."""
+        chat_id = update.effective_chat.id
+        logger.info('Команда /status из чата %s', chat_id)
+        update.effective_message.reply_text(self.reply(chat_id))
+
+
+def create_updater(
+    token: str,
+    store: StateStore,
+    lookup: SubscriptionLookup,
+    locales: Optional[LocaleLookup] = None
+) -> 'Updater':
+    """Создание Updater с обработчиком /status."""
+    from telegram.ext import CommandHandler, Updater
+
+    updater = Updater(token=token, use_context=True)
+    updater.dispatcher.add_handler(
+        CommandHandler('status', StatusCommand(store, lookup, locales))
+    )
+    return updater
+
+
+def start_updates(updater: 'Updater', mode: str = BOT_UPDATES) -> None:
+    """Запуск приема обновлений: webhook или long polling."""
+    if mode == 'webhook':
+        url_path = updater.bot.token
+        updater.start_webhook(
+            listen=BOT_WEBHOOK_LISTEN,
+            port=BOT_WEBHOOK_PORT,
+            url_path=url_path,
+            webhook_url=f'{BOT_WEBHOOK_URL.rstrip("/")}/{url_path}'
+        )
+    elif mode == 'polling':
+        updater.start_polling(drop_pending_updates=True)
+    else:
+        raise ValueError(f'Неизвестный режим приема обновлений: {mode}')
+    logger.info('Прием команд запущен в режиме %s', mode)
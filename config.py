@@ -0,0 +1,48 @@
+"""Настройки из переменных окружения и файла .env.
+
+Модули читают свои настройки при импорте через getenv(). Если процесс
+запущен скриптом репозитория (python engine.py, supervisor.py,
+python -m benchmarks.replay), первый вызов загружает .env, поэтому
+значения из файла действуют для всех настроек, а не только для
+токенов. Импорт модулей из другого кода .env не читает и python-dotenv
+не импортирует: токены загружает явный вызов homework.init_config().
+Путь к файлу задает ENV_FILE, пустое значение отключает загрузку.
+"""
+import os
+import sys
+from typing import Optional
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ENV_FILE = os.environ.get('ENV_FILE', os.path.join(ROOT, '.env'))
+SCRIPT_DIRS = (ROOT, os.path.join(ROOT, 'benchmarks'))
+
+_loaded = False
+
+
+def started_as_script() -> bool:
+    """Запущен ли процесс скриптом репозитория, а не импортом модуля."""
+    path = getattr(sys.modules.get('__main__'), '__file__', None)
+    if not path:
+        return False
+    return os.path.dirname(os.path.abspath(path)) in SCRIPT_DIRS
+
+
+def load_env(override: bool = False) -> None:
+    """Загрузка ENV_FILE в окружение процесса.
+
+    С override значения из файла заменяют уже заданные в окружении.
+    """
+    global _loaded
+    _loaded = True
+    if not ENV_FILE or not os.path.exists(ENV_FILE):
+        return
+    from dotenv import load_dotenv
+
+    load_dotenv(ENV_FILE, override=override)
+
+
+def getenv(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Значение переменной окружения, у скриптов - с учетом .env."""
+    if not _loaded and started_as_script():
+        load_env()
+    return os.getenv(name, default)
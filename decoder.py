@@ -0,0 +1,91 @@
+"""Разбор ответа API Практикума за один проход.
+
+Тело ответа разбирается orjson, если он установлен, иначе модулем json.
+Проверка структуры выполняется в том же проходе, что и сборка
+компактных записей ДЗ. Проверки check_homeworks и homework_fields
+общие с check_response и parse_status.
+"""
+import json
+from typing import List, NamedTuple, Optional, Tuple
+
+from exceptions import (
+    HomeworksKeyNotFoundException,
+    NameKeyError,
+    NotListTypeError,
+    StatusKeyError
+)
+from records import Homework, intern_status
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Answer(NamedTuple):
+    """Разобранный ответ API."""
+
+    homeworks: List[Homework]
+    current_date: Optional[int]
+
+
+def loads(content: bytes) -> object:
+    """Разбор JSON, быстрый при установленном orjson."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def check_homeworks(data: object) -> list:
+    """Список ДЗ из ответа API с проверкой структуры ответа."""
+    if not isinstance(data, dict):
+        raise NotListTypeError(
+            'В ответ API попал список.'
+            f'Ответ API: {data}.'
+        )
+    if 'homeworks' not in data:
+        raise HomeworksKeyNotFoundException(
+            'Отсутствует ключ "homeworks" в API.'
+            f'Ответ API: {data}'
+        )
+    homeworks = data['homeworks']
+    if not isinstance(homeworks, list):
+        raise NotListTypeError(
+            'В ответ API по ключу попал не список.'
+            f'Ответ API: {homeworks}.'
+        )
+    return homeworks
+
+
+def homework_fields(homework: dict) -> Tuple[str, str]:
+    """Название и статус ДЗ с проверкой наличия ключей."""
+    status = homework.get('status')
+    if status is None:
+        raise StatusKeyError(
+            'Ответ API не содержит ключа "status".'
+            f'В ответ пришел словарь: {homework}'
+        )
+    name = homework.get('homework_name')
+    if name is None:
+        raise NameKeyError(
+            'Ответ API не содержит ключа "name".'
+            f'В ответ пришел словарь: {homework}'
+        )
+    return name, status
+
+
+def decode_answer(data: object) -> Answer:
+    """Проверка структуры ответа и сборка компактных записей ДЗ."""
+    records = []
+    for homework in check_homeworks(data):
+        name, status = homework_fields(homework)
+        records.append(Homework(name, intern_status(status)))
+    current_date = data.get('current_date')
+    if type(current_date) is not int:
+        current_date = None
+    return Answer(records, current_date)
+
+
+def parse_answer(content: bytes) -> Answer:
+    """Разбор тела ответа API в компактную форму."""
+    return decode_answer(loads(content))
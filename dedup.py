@@ -0,0 +1,87 @@
+"""Подавление повторных уведомлений по отпечатку события.
+
+Отпечаток строится из нормализованных полей события: подписка, работа и
+статус или подписка и класс исключения, а не из текста сообщения, в
+который попадают изменчивые подробности ошибки. Недавние отпечатки
+хранятся в ограниченном LRU с временем жизни: каждая запись занимает
+одинаковую память, поэтому потолок не зависит от числа подписок.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+import config
+import metrics
+
+DEDUP_TTL = float(config.getenv('DEDUP_TTL', 900))
+DEDUP_SIZE = int(config.getenv('DEDUP_SIZE', 100000))
+
+SUPPRESSED = metrics.counter(
+    'notifications_suppressed_total',
+    'Повторные уведомления, не отправленные пользователю.',
+    ('kind',)
+)
+
+
+def fingerprint(*parts: object) -> int:
+    """Отпечаток фиксированного размера из частей события."""
+    digest = hashlib.blake2b(
+        '\0'.join(map(str, parts)).encode(), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def status_fingerprint(sub_id: str, homework_name: str, status: str) -> int:
+    """Отпечаток смены статуса ДЗ."""
+    return fingerprint(sub_id, 'status', homework_name, status)
+
+
+def error_fingerprint(sub_id: str, error: BaseException) -> int:
+    """Отпечаток сбоя по классу исключения без текста ошибки."""
+    return fingerprint(sub_id, 'error', type(error).__name__)
+
+
+class SeenSet:
+    """Отпечатки уведомлений, отправленных за последние ttl секунд.
+
+    Не больше max_entries записей: при переполнении вытесняется
+    запись, которая дольше всех не встречалась.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEDUP_TTL,
+        max_entries: int = DEDUP_SIZE,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """Пустое множество со сроком ttl и потолком max_entries."""
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._seen: 'OrderedDict[int, float]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Число запомненных отпечатков."""
+        return len(self._seen)
+
+    def seen(self, key: int, kind: str = 'status') -> bool:
+        """Было ли такое уведомление недавно; новое запоминается.
+
+        Повтор не продлевает срок: после ttl с первого уведомления
+        событие снова считается новым.
+        """
+        now = self.clock()
+        with self._lock:
+            sent_at = self._seen.get(key)
+            if sent_at is not None and now - sent_at < self.ttl:
+                self._seen.move_to_end(key)
+                SUPPRESSED.inc((kind,))
+                return True
+            self._seen[key] = now
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return False
@@ -0,0 +1,636 @@
+"""Асинхронный движок опроса API Практикума для множества подписок."""
+import asyncio
+import contextvars
+import itertools
+import logging
+import os
+import random
+import signal
+import sqlite3
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+import config
+import homework
+import metrics
+from breaker import CircuitBreaker
+from coalesce import SingleFlight
+from commands import BOT_UPDATES, create_updater, start_updates
+from decoder import Answer
+from dedup import SeenSet, error_fingerprint, status_fingerprint
+from exceptions import EndpointUnavailableError
+from homework import (
+    RETRY_TIME,
+    diff_records,
+    fetch_homework_statuses,
+    format_status,
+    set_http_session,
+    set_response_cache,
+    shift_from_date
+)
+from http_client import create_session
+from logging_setup import cycle_var, setup_logging, subscription_var
+from outbox import OUTBOX_CONCURRENCY, Outbox
+from profiling import install_profiler
+from records import Homework, HomeworkStatus
+from response_cache import ResponseCache
+from scheduler import AdaptiveScheduler
+from state import MemoryStateStore, StateStore, create_state_store
+from subscriptions import (
+    NO_SUBSCRIPTIONS_MESSAGE,
+    SUBSCRIPTIONS_FILE,
+    Subscription,
+    SubscriptionSource,
+    env_subscriptions
+)
+from supervisor import shard
+from templates import load_custom_statuses
+from wakeup import DRAIN_TIMEOUT, RELOAD, REFRESH, SIGNAL_REASONS, STOP
+
+if TYPE_CHECKING:
+    from telegram import Bot
+
+POLL_CONCURRENCY = int(config.getenv('POLL_CONCURRENCY', 100))
+SUBSCRIPTIONS_RELOAD_INTERVAL = float(
+    config.getenv('SUBSCRIPTIONS_RELOAD_INTERVAL', 10)
+)
+SCHEDULER_TICK = float(config.getenv('SCHEDULER_TICK', 1))
+
+NO_UPDATES_MESSAGE = 'Отсутсвует обновление статуса проверки ДЗ.'
+OUTAGE_MESSAGE = (
+    'API Практикума недоступно, проверка статусов приостановлена. '
+    'Бот сообщит об изменениях после восстановления.'
+)
+OUTAGE_ERRORS = (
+    EndpointUnavailableError,
+    requests.ConnectionError,
+    requests.Timeout
+)
+
+POLLS = metrics.counter(
+    'polls_total', 'Опросы API по результату.', ('result',)
+)
+PIPELINE_ERRORS = metrics.counter(
+    'pipeline_errors_total',
+    'Исключения check_response и parse_status по классу.',
+    ('exception',)
+)
+SCHEDULER_LAG = metrics.histogram(
+    'scheduler_lag_seconds', 'Опоздание опроса относительно расписания.'
+)
+OUTBOX_DEPTH = metrics.gauge(
+    'outbox_depth', 'Сообщений в очереди отправки.'
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LazyBot:
+    """Бот, создаваемый при первом обращении к нему.
+
+    Импорт python-telegram-bot не задерживает первый опрос API: бот
+    создается в потоке, отправляющем первое сообщение.
+    """
+
+    def __init__(self, factory: Callable[[], 'Bot']) -> None:
+        """Бот будет создан вызовом factory."""
+        self._factory = factory
+        self._bot = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> object:
+        """Атрибут бота, создаваемого при первом обращении."""
+        if self._bot is None:
+            with self._lock:
+                if self._bot is None:
+                    self._bot = self._factory()
+        return getattr(self._bot, name)
+
+
+def create_bot(token: str) -> 'Bot':
+    """Бот с пулом соединений под параллельную отправку."""
+    from telegram import Bot
+    from telegram.utils.request import Request
+
+    return Bot(
+        token=token, request=Request(con_pool_size=OUTBOX_CONCURRENCY + 4)
+    )
+
+
+class PollingEngine:
+    """Опрос всех подписок из одного event loop с ограничением параллелизма.
+
+    Блокирующие вызовы `requests` и `telegram.Bot` выполняются в пуле
+    потоков, размер которого совпадает с лимитом параллельных опросов.
+    Подписки с общим токеном опрашиваются одновременно с общей отметкой
+    from_date, поэтому к API уходит один запрос на токен.
+    """
+
+    def __init__(
+        self,
+        bot: 'Bot',
+        subscriptions: List[Subscription],
+        concurrency: int = POLL_CONCURRENCY,
+        retry_time: int = RETRY_TIME,
+        store: Optional[StateStore] = None,
+        source: Optional[SubscriptionSource] = None
+    ) -> None:
+        """Движок для подписок с отметками из хранилища store."""
+        self.bot = bot
+        self.subscriptions = list(subscriptions)
+        self.source = source
+        self.store = store or MemoryStateStore()
+        self.groups: Dict[str, List[Subscription]] = defaultdict(list)
+        for subscription in subscriptions:
+            self.restore(subscription)
+            self.groups[subscription.token_key].append(subscription)
+        for group in self.groups.values():
+            from_date = min(sub.from_date for sub in group)
+            for subscription in group:
+                subscription.from_date = from_date
+        self.singleflight = SingleFlight()
+        self.scheduler = AdaptiveScheduler(initial_interval=retry_time)
+        self._tasks = set()
+        self._cycles = itertools.count(1)
+        self.outbox = Outbox(self.send_now)
+        self.breaker = CircuitBreaker()
+        self.seen = SeenSet()
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.semaphore = None
+        self.stopping: Optional[asyncio.Event] = None
+        self.concurrency = concurrency
+
+    def subscription_ids(self, chat_id: int) -> List[str]:
+        """Идентификаторы подписок чата."""
+        return [
+            sub.id for sub in self.subscriptions if sub.chat_id == chat_id
+        ]
+
+    def add_subscription(self, subscription: Subscription) -> None:
+        """Добавление подписки в работающий движок.
+
+        Подписка на уже опрашиваемый токен получает отметку опроса группы.
+        """
+        self.restore(subscription)
+        group = self.groups.get(subscription.token_key)
+        if group:
+            subscription.from_date = group[0].from_date
+            group.append(subscription)
+        else:
+            group = self.groups[subscription.token_key] = [subscription]
+            self.scheduler.add(subscription.token_key, group)
+        self.subscriptions.append(subscription)
+
+    def remove_subscription(self, subscription: Subscription) -> None:
+        """Удаление подписки из работающего движка."""
+        group = self.groups.get(subscription.token_key, [])
+        if subscription in group:
+            group.remove(subscription)
+        if not group:
+            self.groups.pop(subscription.token_key, None)
+            self.scheduler.remove(subscription.token_key)
+        self.subscriptions.remove(subscription)
+
+    def apply(self, subscriptions: List[Subscription]) -> Tuple[int, int]:
+        """Применение нового списка подписок без перезапуска.
+
+        Добавляются и удаляются только изменившиеся подписки, остальные
+        сохраняют отметку опроса и место в расписании. Возвращает число
+        добавленных и удаленных подписок.
+        """
+        current = {sub.id: sub for sub in self.subscriptions}
+        fresh = {sub.id: sub for sub in subscriptions}
+        removed = [current[key] for key in current.keys() - fresh.keys()]
+        added = [fresh[key] for key in fresh.keys() - current.keys()]
+        for subscription in removed:
+            self.remove_subscription(subscription)
+        for subscription in added:
+            self.add_subscription(subscription)
+        for key in current.keys() & fresh.keys():
+            current[key].locale = fresh[key].locale
+        return len(added), len(removed)
+
+    async def reload_subscriptions(self) -> None:
+        """Перечитывание файла подписок и применение изменений."""
+        try:
+            subscriptions = await self._call(self.source.load)
+        except (OSError, ValueError, sqlite3.Error) as error:
+            logger.error('Не удалось перечитать подписки: %s', error)
+            return
+        added, removed = self.apply(subscriptions)
+        logger.info(
+            'Подписки перечитаны: добавлено %s, удалено %s, всего %s',
+            added, removed, len(self.subscriptions)
+        )
+
+    async def _reload_forever(self) -> None:
+        while True:
+            await asyncio.sleep(SUBSCRIPTIONS_RELOAD_INTERVAL)
+            if self.source.changed():
+                await self.reload_subscriptions()
+
+    async def reload(self) -> None:
+        """Перечитывание .env, своих статусов ДЗ и подписок, затем опрос."""
+        try:
+            await self._call(homework.reload_config)
+        except (OSError, ValueError) as error:
+            logger.error('Не удалось перечитать настройки: %s', error)
+        if self.source is not None:
+            await self.reload_subscriptions()
+        self.poll_now()
+
+    def poll_now(self) -> None:
+        """Внеочередной опрос всех токенов при следующем шаге расписания."""
+        for key, group in self.groups.items():
+            self.scheduler.schedule(key, group, 0)
+        logger.info('Внеочередной опрос токенов: %s', len(self.groups))
+
+    def request_reload(self) -> None:
+        """Запуск reload() из обработчика сигнала."""
+        task = asyncio.ensure_future(self.reload())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def restore(self, subscription: Subscription) -> None:
+        """Восстановление отметки опроса и последнего сообщения."""
+        from_date = self.store.get_cursor(subscription.id)
+        if from_date is not None:
+            subscription.from_date = from_date
+        previous_message = self.store.get_delivery(subscription.id)
+        if previous_message is not None:
+            subscription.previous_message = previous_message
+
+    async def _call(self, func, *args):
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.executor, context.run, func, *args
+        )
+
+    async def send_now(self, chat_id: int, message: str) -> None:
+        """Немедленная отправка сообщения ботом, минуя очередь."""
+        await self._call(self.bot.send_message, chat_id, message)
+
+    def send(self, subscription: Subscription, message: str) -> None:
+        """Постановка сообщения для чата подписки в очередь отправки."""
+        self.outbox.put(subscription.chat_id, message)
+
+    def notify_outage(self) -> None:
+        """Одно уведомление о недоступности API на каждый чат."""
+        for chat_id in {sub.chat_id for sub in self.subscriptions}:
+            self.outbox.put(chat_id, OUTAGE_MESSAGE)
+
+    async def fetch(
+        self, subscription: Subscription
+    ) -> Optional[Tuple[Answer, bool]]:
+        """Ответ API для подписки, общий для одинаковых запросов.
+
+        Одновременные запросы с тем же токеном и from_date ждут
+        один запрос к API и получают его ответ или исключение.
+        Второй элемент - изменился ли ответ с прошлого запроса токена.
+        """
+        token, from_date = subscription.token, subscription.from_date
+        return await self.singleflight.do(
+            (token, from_date), lambda: self._request(token, from_date)
+        )
+
+    async def _request(
+        self, token: str, from_date: int
+    ) -> Optional[Tuple[Answer, bool]]:
+        async with self.semaphore:
+            if not self.breaker.allow():
+                return None
+            try:
+                response = await self._call(
+                    fetch_homework_statuses, token, from_date
+                )
+            except OUTAGE_ERRORS:
+                if self.breaker.record_failure():
+                    self.notify_outage()
+                raise
+            except Exception:
+                self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            return response
+
+    async def notify_changes(
+        self, subscription: Subscription, records: List[Homework]
+    ) -> int:
+        """Одно уведомление на каждое реальное изменение статуса ДЗ."""
+        statuses = self.store.get_statuses(subscription.id)
+        events = diff_records(records, statuses)
+        if not events:
+            logger.debug('%s: %s', subscription, NO_UPDATES_MESSAGE)
+        for event in events:
+            name, status = event.homework.name, event.homework.status
+            message = format_status(name, status, subscription.locale)
+            key = status_fingerprint(subscription.id, name, status)
+            if not self.seen.seen(key):
+                self.send(subscription, message)
+            self.store.set_status(subscription.id, name, status)
+        return len(events)
+
+    async def poll_once(self, subscription: Subscription) -> Optional[int]:
+        """Один цикл проверки статуса ДЗ, возвращает число изменений.
+
+        Если выключатель разомкнут, запрос не выполняется и возвращается
+        None. Ошибки недоступности API не рассылаются каждому чату:
+        о них сообщает notify_outage один раз на сбой. Ответ, не
+        изменившийся с прошлого запроса токена, не разбирается.
+        """
+        changed = 0
+        subscription_var.set(subscription.id)
+        cycle_var.set(next(self._cycles))
+        try:
+            result = await self.fetch(subscription)
+            if result is None:
+                POLLS.inc(('suppressed',))
+                return None
+            answer, modified = result
+            if modified:
+                changed = await self.notify_changes(
+                    subscription, answer.homeworks
+                )
+            subscription.from_date = shift_from_date(
+                answer.current_date, subscription.from_date
+            )
+            self.store.set_cursor(subscription.id, subscription.from_date)
+            current_message = ''
+            POLLS.inc(('ok',))
+        except OUTAGE_ERRORS as error:
+            POLLS.inc(('outage',))
+            logger.error('%s: %s', subscription, error)
+            return changed
+        except Exception as error:
+            POLLS.inc(('error',))
+            PIPELINE_ERRORS.inc((type(error).__name__,))
+            logger.error('%s: %s', subscription, error)
+            current_message = f'Сбой в работе программы: {error}'
+            key = error_fingerprint(subscription.id, error)
+            if (
+                current_message != subscription.previous_message
+                and not self.seen.seen(key, 'error')
+            ):
+                self.send(subscription, current_message)
+        subscription.previous_message = current_message
+        self.store.set_delivery(subscription.id, current_message)
+        return changed
+
+    def is_active(self, subscription: Subscription) -> bool:
+        """Есть ли у подписки работы на проверке."""
+        statuses = self.store.get_statuses(subscription.id).values()
+        return HomeworkStatus.REVIEWING in statuses
+
+    async def poll_group(self, group: List[Subscription]) -> Optional[int]:
+        """Опрос подписок с общим токеном одним запросом к API.
+
+        Возвращает суммарное число изменений или None, если опрос
+        пропущен выключателем.
+        """
+        results = await asyncio.gather(
+            *(self.poll_once(subscription) for subscription in group)
+        )
+        if all(result is None for result in results):
+            return None
+        return sum(result or 0 for result in results)
+
+    async def _poll_and_reschedule(self, group: List[Subscription]) -> None:
+        key = group[0].token_key
+        changed = await self.poll_group(group)
+        if self.groups.get(key) is not group:
+            return
+        if changed is None:
+            self.scheduler.schedule(
+                key,
+                group,
+                self.breaker.retry_in()
+                + random.uniform(0, self.scheduler.min_interval)
+            )
+            return
+        self.scheduler.reschedule(
+            key, bool(changed), any(map(self.is_active, group))
+        )
+
+    async def _schedule_forever(self) -> None:
+        for key, group in self.groups.items():
+            self.scheduler.add(key, group)
+        while True:
+            due = self.scheduler.pop_due()
+            if due:
+                SCHEDULER_LAG.observe(self.scheduler.lag)
+            for group in due:
+                task = asyncio.ensure_future(self._poll_and_reschedule(group))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            delay = self.scheduler.time_until_next()
+            if delay is None or delay > SCHEDULER_TICK:
+                delay = SCHEDULER_TICK
+            await asyncio.sleep(delay)
+
+    async def _flush_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.store.flush_interval)
+            if not self.store.flush_due():
+                continue
+            try:
+                await self._call(self.store.flush)
+            except (OSError, sqlite3.Error) as error:
+                logger.error('Состояние не сохранено, повтор позже: %s', error)
+
+    def stop(self) -> None:
+        """Остановка опроса, вызывается из потока event loop."""
+        if self.stopping is not None:
+            self.stopping.set()
+
+    def _install_signal_handlers(self) -> None:
+        loop = asyncio.get_running_loop()
+        actions = {
+            STOP: self.stop,
+            RELOAD: self.request_reload,
+            REFRESH: self.poll_now,
+        }
+        for name, reason in SIGNAL_REASONS.items():
+            signum = getattr(signal, name, None)
+            if signum is None:
+                continue
+            try:
+                loop.add_signal_handler(signum, actions[reason])
+            except (NotImplementedError, RuntimeError, ValueError):
+                return
+
+    async def shutdown(
+        self, background: List[asyncio.Task], timeout: float = DRAIN_TIMEOUT
+    ) -> None:
+        """Завершение начатых опросов и отправка очереди сообщений.
+
+        background - задача обработчиков очереди и прочие фоновые
+        задачи. Новые опросы не запускаются, очередь отправляется,
+        пока не истечет timeout, затем все задачи отменяются, а
+        неотправленные сообщения сохраняются в хранилище.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        _, *others = background
+        for task in others:
+            task.cancel()
+        if self._tasks:
+            logger.info('Ожидание начатых опросов: %s', len(self._tasks))
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+        left = await self.outbox.drain(max(deadline - loop.time(), 0))
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        self.save_undelivered()
+        if left:
+            logger.warning(
+                'Не отправлено сообщений при остановке, '
+                'они будут отправлены после запуска: %s', len(self.outbox)
+            )
+
+    def undelivered_owner(self, chat_id: int) -> str:
+        """Владелец очереди чата: наименьший отпечаток его токенов.
+
+        Процессы supervisor делят подписки по отпечатку токена, поэтому
+        у чата с токенами в разных процессах записи разные, а после
+        перезапуска каждую восстановит ровно один процесс.
+        """
+        return min(
+            (
+                sub.token_key for sub in self.subscriptions
+                if sub.chat_id == chat_id
+            ),
+            default=min(self.groups, default='')
+        )
+
+    def save_undelivered(self) -> None:
+        """Сохранение очереди отправки в хранилище состояния."""
+        for chat_id, messages in list(self.outbox.pending.items()):
+            self.store.set_undelivered(
+                chat_id, self.undelivered_owner(chat_id), messages
+            )
+
+    def restore_undelivered(self) -> None:
+        """Постановка в очередь сообщений, не отправленных до остановки.
+
+        Берутся только записи токенов этого процесса: у процессов
+        supervisor общее хранилище, и чужие сообщения отправит их процесс.
+        """
+        restored = 0
+        undelivered = self.store.get_undelivered()
+        for (chat_id, owner), messages in undelivered.items():
+            if owner not in self.groups:
+                continue
+            for message in messages:
+                self.outbox.put(chat_id, message)
+            self.store.set_undelivered(chat_id, owner, [])
+            restored += len(messages)
+        if restored:
+            logger.info(
+                'В очередь возвращены сообщения прошлого запуска: %s',
+                restored
+            )
+
+    async def run(self) -> None:
+        """Опрос всех подписок до stop(), SIGTERM или SIGINT.
+
+        SIGHUP перечитывает настройки и подписки, SIGUSR1 запускает
+        внеочередной опрос всех токенов.
+        """
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.stopping = asyncio.Event()
+        self._install_signal_handlers()
+        OUTBOX_DEPTH.set_function(lambda: len(self.outbox))
+        self.restore_undelivered()
+        logger.info(
+            'Движок запущен. Подписок: %s, токенов: %s, '
+            'параллельных опросов: %s',
+            len(self.subscriptions), len(self.groups), self.concurrency
+        )
+        background = [
+            asyncio.ensure_future(self.outbox.run()),
+            asyncio.ensure_future(self._flush_forever()),
+            asyncio.ensure_future(self._schedule_forever()),
+        ]
+        if self.source is not None:
+            background.append(asyncio.ensure_future(self._reload_forever()))
+        stopping = asyncio.ensure_future(self.stopping.wait())
+        try:
+            done, _ = await asyncio.wait(
+                [stopping, *background], return_when=asyncio.FIRST_COMPLETED
+            )
+            logger.info('Остановка движка')
+            await self.shutdown(background)
+            for task in done - {stopping}:
+                task.result()
+        finally:
+            stopping.cancel()
+            self.executor.shutdown(wait=False)
+            self.store.close()
+            logger.info('Движок остановлен, состояние сохранено')
+
+
+def main(worker_index: int = 0, worker_count: int = 1):
+    """Запуск движка для подписок из SUBSCRIPTIONS_FILE.
+
+    При запуске из supervisor процесс обслуживает только свою часть
+    подписок, а команды бота принимает только процесс с номером 0.
+    """
+    homework.init_config()
+    token = homework.TELEGRAM_TOKEN
+    if not token:
+        logger.critical(
+            'Программа принудительно остановлена. '
+            'Отсутствует обязательная переменная окружения.'
+        )
+        exit()
+    load_custom_statuses()
+    source = None
+    if os.path.exists(SUBSCRIPTIONS_FILE):
+        source = SubscriptionSource(
+            SUBSCRIPTIONS_FILE,
+            lambda subscriptions: shard(
+                subscriptions, worker_index, worker_count,
+                key=lambda sub: sub.token_key
+            )
+        )
+        subscriptions = source.load()
+    else:
+        subscriptions = env_subscriptions()
+        if not subscriptions:
+            logger.critical(NO_SUBSCRIPTIONS_MESSAGE)
+            exit()
+    if metrics.METRICS_PORT:
+        metrics.start_http_server(metrics.METRICS_PORT + worker_index)
+    set_http_session(create_session(pool_size=POLL_CONCURRENCY))
+    set_response_cache(ResponseCache())
+    store = create_state_store()
+    bot = LazyBot(lambda: create_bot(token))
+    install_profiler(timings=None)
+    engine = PollingEngine(bot, subscriptions, store=store, source=source)
+    updater = None
+    if BOT_UPDATES and worker_index == 0:
+        if source is not None:
+            updater = create_updater(
+                token, store, source.subscription_ids, source.locale
+            )
+        else:
+            updater = create_updater(token, store, engine.subscription_ids)
+        start_updates(updater)
+    try:
+        asyncio.run(engine.run())
+    finally:
+        if updater is not None:
+            updater.stop()
+
+
+if __name__ == '__main__':
+    listener = setup_logging()
+    try:
+        main()
+    finally:
+        listener.stop()
@@ -20,3 +20,7 @@ class NameKeyError(KeyError):
 
 class NotListTypeError(TypeError):
     """В ответ API по ключу попал не список.'"""
+
+
+class EndpointUnavailableError(ServerError):
+    """Эндпойнт временно недоступен: 5xx, таймаут или лимит запросов."""
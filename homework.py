@@ -1,115 +1,279 @@
+import itertools
 import logging
-import os
-import sys
 import time
 from http import HTTPStatus
-from logging.handlers import RotatingFileHandler
-
-import requests
-from dotenv import load_dotenv
-from telegram import Bot, TelegramError
-
-from exceptions import (
-    HomeworksKeyNotFoundException,
-    NameKeyError,
-    NotImplementedStatusException,
-    NotListTypeError,
-    ServerError,
-    StatusKeyError
-)
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import config
+import metrics
+from decoder import Answer, check_homeworks, homework_fields, parse_answer
+from dedup import SeenSet, error_fingerprint, status_fingerprint
+from exceptions import EndpointUnavailableError, ServerError
+from logging_setup import cycle_var, setup_logging
+from profiling import TIMINGS, install_profiler
+from records import Homework, Status, StatusEvent
+from response_cache import ResponseCache
+from state import create_state_store, subscription_id
+from templates import TEMPLATES, load_custom_statuses
+from wakeup import RELOAD, Waker
+
+if TYPE_CHECKING:
+    import requests
+    from telegram import Bot
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-PRACTICUM_TOKEN = os.getenv('PRACT_TOKEN')
-TELEGRAM_TOKEN = os.getenv('TOKEN')
-TELEGRAM_CHAT_ID = os.getenv('CHAT_ID')
+PRACTICUM_TOKEN = config.getenv('PRACT_TOKEN')
+TELEGRAM_TOKEN = config.getenv('TOKEN')
+TELEGRAM_CHAT_ID = config.getenv('CHAT_ID')
 
 RETRY_TIME = 600
+CLOCK_SKEW = int(config.getenv('CLOCK_SKEW', 60))
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+UNAVAILABLE_STATUSES = (
+    HTTPStatus.REQUEST_TIMEOUT,
+    HTTPStatus.TOO_MANY_REQUESTS
+)
 
-VERDICTS = {
-    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
-    'reviewing': 'Работа взята на проверку ревьюером.',
-    'rejected': 'Работа проверена: у ревьюера есть замечания.'
-}
+http_session = None
+response_cache: Optional[ResponseCache] = None
 
+API_LATENCY = metrics.histogram(
+    'practicum_request_seconds',
+    'Время запроса к API Практикума по коду ответа.',
+    ('status_code',)
+)
+
+VERDICTS = TEMPLATES.verdicts[TEMPLATES.default_locale]
+
+
+def init_config(override: bool = False) -> None:
+    """Загрузка .env и перечитывание токенов.
+
+    Вызывается точками входа, а не при импорте модуля. С override
+    значения из .env заменяют уже заданные в окружении.
+    """
+    global PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, HEADERS
+    config.load_env(override=override)
+    PRACTICUM_TOKEN = config.getenv('PRACT_TOKEN')
+    TELEGRAM_TOKEN = config.getenv('TOKEN')
+    TELEGRAM_CHAT_ID = config.getenv('CHAT_ID')
+    HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+
+
+def reload_config() -> None:
+    """Перечитывание .env и своих статусов ДЗ без перезапуска."""
+    init_config(override=True)
+    load_custom_statuses()
+    logger.info('Настройки перечитаны.')
+
+
+def send_chat_message(bot: 'Bot', chat_id: int, message: str) -> bool:
+    """Отправка сообщения в указанный чат через бота."""
+    from telegram import TelegramError
 
-def send_message(bot: Bot, message: str) -> None:
-    """Отправка сообщение пользователю через бота."""
     try:
-        logger.info(f'Бот начал отправку telegram сообщения: {message}')
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        logger.info('Бот начал отправку telegram сообщения: %s', message)
+        bot.send_message(chat_id, message)
     except TelegramError as telegram_error:
-        logger.error(f'Ошибка отправки telegram сообщения: {telegram_error}')
-    else:
-        logger.info(f'Пользователю отправленно сообщение: {message}')
+        logger.error('Ошибка отправки telegram сообщения: %s', telegram_error)
+        return False
+    logger.info('Пользователю отправленно сообщение: %s', message)
+    return True
 
 
-def get_api_answer(current_timestamp: int) -> dict:
-    """Получение API с сервера Яндекса."""
-    timestamp = current_timestamp
+def send_message(bot: 'Bot', message: str) -> None:
+    """Отправка сообщение пользователю через бота."""
+    send_chat_message(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_once(
+    bot: 'Bot', seen: SeenSet, key: int, message: str, kind: str = 'status'
+) -> None:
+    """Отправка сообщения, если о таком событии недавно не сообщалось."""
+    if seen.seen(key, kind):
+        logger.debug('Повторное уведомление не отправлено: %s', message)
+        return
+    send_message(bot, message)
+
+
+def set_http_session(session: 'requests.Session') -> None:
+    """Подключение общей HTTP-сессии для запросов к API."""
+    global http_session
+    http_session = session
+
+
+def send_request(
+    token: str, current_timestamp: int, validators: Optional[dict] = None
+) -> 'requests.Response':
+    """GET к эндпойнту API с замером времени ответа."""
+    import requests
+
+    headers = {'Authorization': f'OAuth {token}'}
+    if validators:
+        headers.update(validators)
     request_params = {
         'url': ENDPOINT,
-        'headers': HEADERS,
-        'params': {'from_date': timestamp}}
-    response = requests.get(**request_params)
-    if response.status_code != HTTPStatus.OK:
-        raise ServerError(
-            'Сбой при обращении к эндпойнту. Ответ сервера: '
-            f'{response.status_code}. Reason: {response.reason}. '
-            # Поменял {request_params} на ENDPOINT & HEADERS
-            # потому что в сообщение приходило каждый раз новое
-            # время и сообщение каждый раз было уникальным
-            f'Url: {ENDPOINT}. Headers: {HEADERS}'
+        'headers': headers,
+        'params': {'from_date': current_timestamp}}
+    client = http_session or requests
+    started = time.perf_counter()
+    try:
+        response = client.get(**request_params)
+    except Exception as error:
+        API_LATENCY.observe(
+            time.perf_counter() - started, (type(error).__name__,)
         )
-    return response.json()
+        raise
+    API_LATENCY.observe(
+        time.perf_counter() - started, (str(int(response.status_code)),)
+    )
+    return response
+
+
+def check_status_code(response: 'requests.Response', token: str) -> None:
+    """Исключение, если сервер ответил не 200 OK."""
+    if response.status_code == HTTPStatus.OK:
+        return
+    headers = {'Authorization': f'OAuth {token}'}
+    error_class = ServerError
+    if (
+        response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+        or response.status_code in UNAVAILABLE_STATUSES
+    ):
+        error_class = EndpointUnavailableError
+    raise error_class(
+        'Сбой при обращении к эндпойнту. Ответ сервера: '
+        f'{response.status_code}. Reason: {response.reason}. '
+        # Поменял {request_params} на ENDPOINT & HEADERS
+        # потому что в сообщение приходило каждый раз новое
+        # время и сообщение каждый раз было уникальным
+        f'Url: {ENDPOINT}. Headers: {headers}'
+    )
+
+
+def set_response_cache(cache: Optional[ResponseCache]) -> None:
+    """Подключение кэша ответов API."""
+    global response_cache
+    response_cache = cache
+
+
+def fetch_homework_statuses(
+    token: str, current_timestamp: int
+) -> Tuple[Answer, bool]:
+    """Запрос и разбор статусов ДЗ с учетом кэша ответов.
+
+    Второй элемент результата - изменился ли ответ с прошлого запроса
+    по этому токену. Без кэша ответ всегда считается измененным.
+    """
+    cache = response_cache
+    entry = cache.get(token) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry, current_timestamp):
+        return entry.data, False
+    validators = entry.validators() if entry is not None else None
+    response = send_request(token, current_timestamp, validators)
+    if entry is None or response.status_code != HTTPStatus.NOT_MODIFIED:
+        check_status_code(response, token)
+    if cache is not None:
+        return cache.store(token, current_timestamp, response)
+    return parse_answer(response.content), True
+
+
+def request_homework_statuses(token: str, current_timestamp: int) -> dict:
+    """Запрос статусов ДЗ с сервера Яндекса для указанного токена."""
+    with TIMINGS.span('http'):
+        response = send_request(token, current_timestamp)
+        check_status_code(response, token)
+    with TIMINGS.span('decode'):
+        return response.json()
+
+
+def get_api_answer(current_timestamp: int) -> dict:
+    """Получение API с сервера Яндекса."""
+    return request_homework_statuses(PRACTICUM_TOKEN, current_timestamp)
 
 
 def check_response(response: dict) -> list:
     """Проверка наличия ответа о статусе ДЗ."""
-    if not isinstance(response, dict):
-        raise NotListTypeError(
-            'В ответ API попал список.'
-            f'Ответ API: {response}.'
-        )
-    if 'homeworks' not in response:
-        raise HomeworksKeyNotFoundException(
-            'Отсутствует ключ "homeworks" в API.'
-            f'Ответ API: {response}'
-        )
-    new_homework = response.get('homeworks')
-    if not isinstance(new_homework, list):
-        raise NotListTypeError(
-            'В ответ API по ключу попал не список.'
-            f'Ответ API: {new_homework}.'
-        )
-    return new_homework
+    return check_homeworks(response)
 
 
 def parse_status(homework: dict) -> str:
     """Парсинг информации о статусе ДЗ."""
-    homework_name = homework.get('homework_name')
-    homework_status = homework.get('status')
-    if homework_status is None:
-        raise StatusKeyError(
-            'Ответ API не содержит ключа "status".'
-            f'В ответ пришел словарь: {homework}'
-        )
-    if homework_name is None:
-        raise NameKeyError(
-            'Ответ API не содержит ключа "name".'
-            f'В ответ пришел словарь: {homework}'
-        )
-    if homework_status in VERDICTS:
-        verdict = VERDICTS[homework_status]
-        return (
-            f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    homework_name, homework_status = homework_fields(homework)
+    return format_status(homework_name, homework_status)
+
+
+def format_status(
+    homework_name: str, homework_status: Status, locale: Optional[str] = None
+) -> str:
+    """Сообщение об изменении статуса ДЗ на языке чата.
+
+    Для статуса без шаблона поднимается NotImplementedStatusException.
+    """
+    return TEMPLATES.render(homework_name, homework_status, locale)
+
+
+def diff_statuses(homeworks: list, statuses: dict) -> list:
+    """Домашние работы, статус которых изменился с прошлой проверки.
+
+    statuses - индекс последних известных статусов по 'homework_name'.
+    Работы без ключей 'homework_name' или 'status' тоже возвращаются,
+    чтобы parse_status поднял соответствующее исключение.
+    """
+    changed = []
+    for homework in homeworks:
+        homework_name = homework.get('homework_name')
+        homework_status = homework.get('status')
+        if (
+            homework_name is None
+            or homework_status is None
+            or statuses.get(homework_name) != homework_status
+        ):
+            changed.append(homework)
+    return changed
+
+
+def diff_records(
+    records: List[Homework], statuses: dict
+) -> List[StatusEvent]:
+    """События смены статуса ДЗ относительно последних известных."""
+    events = []
+    for record in records:
+        previous = statuses.get(record.name)
+        if previous != record.status:
+            events.append(StatusEvent(record, previous))
+    return events
+
+
+def initial_from_date() -> int:
+    """Начальная отметка опроса с запасом на расхождение часов."""
+    return int(time.time()) - CLOCK_SKEW
+
+
+def next_from_date(response: dict, from_date: int) -> int:
+    """Следующая отметка опроса по ключу 'current_date' ответа API.
+
+    Отметка берется с часов сервера, поэтому расхождение локальных часов
+    не приводит к пропуску или повторной выдаче обновлений.
+    Отметка никогда не сдвигается назад.
+    """
+    return shift_from_date(response.get('current_date'), from_date)
+
+
+def shift_from_date(current_date: Optional[int], from_date: int) -> int:
+    """Следующая отметка опроса по времени сервера current_date."""
+    if type(current_date) is not int:
+        logger.warning(
+            'Ответ API не содержит корректного ключа "current_date". '
+            'Отметка опроса не изменена: %s', from_date
         )
-    raise NotImplementedStatusException(
-        'Неизвестный статус ДЗ в ответе API.'
-        f'Статус ДЗ на сервере: {homework_status}'
-    )
+        return from_date
+    skew = current_date - int(time.time())
+    if abs(skew) > CLOCK_SKEW:
+        logger.warning('Расхождение часов с сервером API: %s с.', skew)
+    return max(current_date, from_date)
 
 
 def check_tokens() -> bool:
@@ -125,52 +289,82 @@ def main():
             'Отсутствует обязательная переменная окружения.'
         )
         exit()
+    load_custom_statuses()
+    from telegram import Bot
+
+    from http_client import create_session
+
     bot = Bot(token=TELEGRAM_TOKEN)
-    send_message(bot, 'Бот начал работу. Держитесь!!!')
-    current_timestamp = int(time.time())
+    set_http_session(create_session())
+    store = create_state_store()
+    sub_id = subscription_id(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)
+    current_timestamp = store.get_cursor(sub_id) or initial_from_date()
+    previous_message = store.get_delivery(sub_id)
+    if previous_message is None:
+        send_message(bot, 'Бот начал работу. Держитесь!!!')
+        previous_message = ''
     current_message = ''
-    previous_message = ''
-    while True:
+    install_profiler()
+    waker = Waker()
+    waker.install()
+    seen = SeenSet()
+    span = TIMINGS.span
+    cycles = itertools.count(1)
+    while not waker.stopping:
+        cycle = next(cycles)
+        cycle_var.set(cycle)
+        TIMINGS.start(cycle)
         try:
             response = get_api_answer(current_timestamp)
-            new_homework = check_response(response)
-            if not new_homework:
-                current_message = 'Отсутсвует обновление статуса проверки ДЗ.'
-                logger.debug(
-                    f'Цикл проверки завершен с сообщением: {current_message}'
-                )
-            else:
-                current_message = parse_status(new_homework[0])
-            if current_message != previous_message:
-                send_message(bot, current_message)
+            with span('check'):
+                new_homework = check_response(response)
+            with span('diff'):
+                statuses = store.get_statuses(sub_id)
+                changed = diff_statuses(new_homework, statuses)
+            if not changed:
+                with span('log'):
+                    logger.debug('Отсутсвует обновление статуса проверки ДЗ.')
+            for homework in changed:
+                with span('parse'):
+                    message = parse_status(homework)
+                with span('send'):
+                    send_once(bot, seen, status_fingerprint(
+                        sub_id, homework['homework_name'], homework['status']
+                    ), message)
+                with span('state'):
+                    store.set_status(
+                        sub_id, homework['homework_name'], homework['status']
+                    )
+            current_timestamp = next_from_date(response, current_timestamp)
+            with span('state'):
+                store.set_cursor(sub_id, current_timestamp)
+            current_message = ''
         except Exception as error:
-            logger.error(f'{error}')
+            with span('log'):
+                logger.error('%s', error)
             current_message = f'Сбой в работе программы: {error}'
             if current_message != previous_message:
-                send_message(bot, current_message)
+                with span('send'):
+                    send_once(
+                        bot, seen, error_fingerprint(sub_id, error),
+                        current_message, 'error'
+                    )
         finally:
-            previous_message = ''
             previous_message = current_message
-            current_timestamp = int(time.time())
-            time.sleep(RETRY_TIME)
+            with span('state'):
+                store.set_delivery(sub_id, current_message)
+                store.flush()
+            TIMINGS.finish()
+        if RELOAD in waker.wait(RETRY_TIME):
+            reload_config()
+    store.close()
+    logger.info('Бот остановлен, состояние сохранено.')
 
 
 if __name__ == '__main__':
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.INFO)
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - func: '
-        '%(funcName)s - line %(lineno)d - %(message)s'
-    )
-    file_handler = RotatingFileHandler(
-        'homework.log',
-        maxBytes=5000000,
-        backupCount=3
-    )
-    stream_handler = logging.StreamHandler(stream=sys.stdout)
-    file_handler.setFormatter(formatter)
-    stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
-    logger.addHandler(file_handler)
-
-    main()
+    init_config()
+    listener = setup_logging()
+    try:
+        main()
+    finally:
+        listener.stop()
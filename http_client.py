@@ -0,0 +1,72 @@
+"""Общая HTTP-сессия с пулом keep-alive соединений к API Практикума."""
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+
+HTTP_CONNECT_TIMEOUT = float(config.getenv('HTTP_CONNECT_TIMEOUT', 3.05))
+HTTP_READ_TIMEOUT = float(config.getenv('HTTP_READ_TIMEOUT', 10))
+HTTP_RETRIES = int(config.getenv('HTTP_RETRIES', 3))
+HTTP_BACKOFF_FACTOR = float(config.getenv('HTTP_BACKOFF_FACTOR', 0.5))
+HTTP_POOL_SIZE = int(config.getenv('HTTP_POOL_SIZE', 10))
+
+RETRY_STATUSES = (502, 503, 504)
+
+
+class TimeoutSession(requests.Session):
+    """Сессия, подставляющая таймауты по умолчанию в каждый запрос."""
+
+    def __init__(self, timeout: Tuple[float, float]) -> None:
+        """Сессия с таймаутами по умолчанию (connect, read)."""
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        """Запрос с таймаутом сессии, если он не передан явно."""
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def create_session(
+    pool_size: int = HTTP_POOL_SIZE,
+    connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+    read_timeout: float = HTTP_READ_TIMEOUT,
+    retries: int = HTTP_RETRIES,
+    backoff_factor: float = HTTP_BACKOFF_FACTOR,
+    pool_block: bool = True
+) -> TimeoutSession:
+    """Создание сессии с ограниченным пулом соединений и повторами.
+
+    Повторы выполняются на уровне транспорта только для ошибок соединения
+    и статусов из RETRY_STATUSES. Последний ответ возвращается как есть,
+    чтобы get_api_answer мог поднять ServerError.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+        pool_block=pool_block
+    )
+    session = TimeoutSession(timeout=(connect_timeout, read_timeout))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def close_session(session: Optional[requests.Session]) -> None:
+    """Закрытие сессии и всех соединений пула."""
+    if session is not None:
+        session.close()
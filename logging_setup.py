@@ -0,0 +1,100 @@
+"""Неблокирующее логирование: очередь и фоновый поток записи."""
+import contextvars
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+import config
+
+LOG_LEVEL = config.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = config.getenv('LOG_FORMAT', 'text')
+LOG_FILE = config.getenv('LOG_FILE', 'homework.log')
+LOG_MAX_BYTES = 5000000
+LOG_BACKUP_COUNT = 3
+
+TEXT_FORMAT = (
+    '%(asctime)s - %(name)s - %(levelname)s - func: '
+    '%(funcName)s - line %(lineno)d - %(message)s'
+)
+
+subscription_var = contextvars.ContextVar('subscription_id', default=None)
+cycle_var = contextvars.ContextVar('cycle_id', default=None)
+
+
+class ContextFilter(logging.Filter):
+    """Добавление в запись идентификаторов подписки и цикла опроса."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Копирование значений контекста в атрибуты записи."""
+        record.subscription_id = subscription_var.get()
+        record.cycle_id = cycle_var.get()
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Постановка записи в очередь без форматирования.
+
+    Стандартный QueueHandler склеивает сообщение с аргументами в
+    вызывающем потоке. Здесь это делает поток QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Запись передается в очередь как есть."""
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    """Одна запись - один JSON объект в строке."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Сериализация записи в JSON."""
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'func': record.funcName,
+            'line': record.lineno,
+            'message': record.getMessage(),
+            'subscription_id': getattr(record, 'subscription_id', None),
+            'cycle_id': getattr(record, 'cycle_id', None),
+        }
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+def setup_logging(
+    level: str = LOG_LEVEL,
+    log_format: str = LOG_FORMAT,
+    log_file: Optional[str] = LOG_FILE
+) -> QueueListener:
+    """Настройка корневого логгера на запись через фоновый поток.
+
+    Возвращает запущенный QueueListener, его нужно остановить при
+    завершении программы, чтобы дописать очередь.
+    """
+    if log_format == 'json':
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(stream=sys.stdout)]
+    if log_file:
+        handlers.append(RotatingFileHandler(
+            log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+    listener = QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    listener.start()
+    return listener
@@ -0,0 +1,261 @@
+"""Реестр метрик в формате Prometheus и HTTP эндпойнт для их сбора.
+
+Наблюдения пишутся в ячейки текущего потока без блокировок,
+суммирование по потокам выполняется только при сборе метрик.
+"""
+import bisect
+import logging
+import threading
+from http import HTTPStatus
+from typing import (
+    TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+)
+
+import config
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+METRICS_PORT = int(config.getenv('METRICS_PORT', 0))
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30
+)
+
+Labels = Tuple[str, ...]
+
+logger = logging.getLogger(__name__)
+
+
+class Metric:
+    """Метрика с ячейками значений, отдельными для каждого потока."""
+
+    type = ''
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        """Метрика с именем, описанием и именами меток."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+
+    def _cells(self) -> dict:
+        try:
+            return self._local.cells
+        except AttributeError:
+            cells = self._local.cells = {}
+            self._shards.append(cells)
+            return cells
+
+    def _snapshot(self) -> List[dict]:
+        return [dict(shard) for shard in list(self._shards)]
+
+    def _format_labels(self, labels: Labels, extra: str = '') -> str:
+        pairs = [
+            f'{name}="{value}"' for name, value in zip(self.labelnames, labels)
+        ]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def samples(self) -> List[str]:
+        """Строки значений в текстовом формате Prometheus."""
+        raise NotImplementedError
+
+    def expose(self) -> str:
+        """Метрика целиком: HELP, TYPE и значения."""
+        return '\n'.join([
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+            *self.samples(),
+        ])
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик."""
+
+    type = 'counter'
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        """Увеличение счетчика."""
+        cells = self._cells()
+        cells[labels] = cells.get(labels, 0) + amount
+
+    def values(self) -> Dict[Labels, float]:
+        """Значения, просуммированные по потокам."""
+        total: Dict[Labels, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                total[labels] = total.get(labels, 0) + value
+        return total
+
+    def samples(self) -> List[str]:
+        """Строки значений в текстовом формате Prometheus."""
+        return [
+            f'{self.name}{self._format_labels(labels)} {value}'
+            for labels, value in sorted(self.values().items())
+        ]
+
+
+class Histogram(Metric):
+    """Гистограмма с фиксированными границами корзин."""
+
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        """Гистограмма с верхними границами корзин buckets."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        """Учет наблюдения: счетчик корзины, сумма и количество."""
+        cells = self._cells()
+        cell = cells.get(labels)
+        if cell is None:
+            cell = cells[labels] = [0] * (len(self.buckets) + 2)
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def values(self) -> Dict[Labels, List[float]]:
+        """Счетчики корзин и сумма, просуммированные по потокам."""
+        total: Dict[Labels, List[float]] = {}
+        for shard in self._snapshot():
+            for labels, cell in shard.items():
+                merged = total.setdefault(labels, [0] * len(cell))
+                for index, value in enumerate(list(cell)):
+                    merged[index] += value
+        return total
+
+    def samples(self) -> List[str]:
+        """Строки значений в текстовом формате Prometheus."""
+        lines = []
+        for labels, cell in sorted(self.values().items()):
+            cumulative = 0
+            bounds = [*map(str, self.buckets), '+Inf']
+            for bound, count in zip(bounds, cell):
+                cumulative += count
+                bucket_labels = self._format_labels(labels, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(
+                f'{self.name}_sum{self._format_labels(labels)} {cell[-1]}'
+            )
+            lines.append(
+                f'{self.name}_count{self._format_labels(labels)} {cumulative}'
+            )
+        return lines
+
+
+class Gauge(Metric):
+    """Текущее значение, вычисляемое функцией в момент сбора метрик."""
+
+    type = 'gauge'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        function: Optional[Callable[[], float]] = None
+    ) -> None:
+        """Показатель, значение которого может вычислять function."""
+        super().__init__(name, documentation)
+        self.function = function
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Установка функции, возвращающей значение."""
+        self.function = function
+
+    def samples(self) -> List[str]:
+        """Строки значений в текстовом формате Prometheus."""
+        if self.function is None:
+            return []
+        return [f'{self.name} {self.function()}']
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self) -> None:
+        """Пустой реестр."""
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """Регистрация метрики, повторная регистрация возвращает прежнюю."""
+        return self.metrics.setdefault(metric.name, metric)
+
+    def expose(self) -> str:
+        """Все метрики в текстовом формате Prometheus."""
+        return '\n'.join(
+            metric.expose() for metric in self.metrics.values()
+        ) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames=()) -> Counter:
+    """Счетчик в общем реестре."""
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(
+    name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+) -> Histogram:
+    """Гистограмма в общем реестре."""
+    return REGISTRY.register(
+        Histogram(name, documentation, labelnames, buckets)
+    )
+
+
+def gauge(name: str, documentation: str) -> Gauge:
+    """Вычисляемое значение в общем реестре."""
+    return REGISTRY.register(Gauge(name, documentation))
+
+
+def create_handler(registry: Registry = REGISTRY) -> type:
+    """Обработчик GET /metrics для реестра.
+
+    http.server импортируется только при запуске эндпойнта.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """GET /metrics."""
+
+        def log_message(self, format, *args):
+            """Запросы сборщика метрик в журнал не пишутся."""
+
+        def do_GET(self):
+            """Отдача метрик реестра."""
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+            body = registry.expose().encode()
+            self.send_response(HTTPStatus.OK)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return MetricsHandler
+
+
+def start_http_server(
+    port: int = METRICS_PORT, host: str = '0.0.0.0'
+) -> 'ThreadingHTTPServer':
+    """Запуск эндпойнта /metrics в фоновом потоке."""
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), create_handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info('Метрики доступны на порту %s', server.server_address[1])
+    return server
@@ -0,0 +1,289 @@
+"""Очередь исходящих telegram сообщений с ограничением частоты."""
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
+
+import config
+import metrics
+
+OUTBOX_GLOBAL_RATE = float(config.getenv('OUTBOX_GLOBAL_RATE', 25))
+OUTBOX_CHAT_RATE = float(config.getenv('OUTBOX_CHAT_RATE', 1))
+OUTBOX_CHAT_BURST = float(config.getenv('OUTBOX_CHAT_BURST', 3))
+OUTBOX_CONCURRENCY = int(config.getenv('OUTBOX_CONCURRENCY', 8))
+OUTBOX_MAX_ATTEMPTS = int(config.getenv('OUTBOX_MAX_ATTEMPTS', 8))
+OUTBOX_BASE_BACKOFF = float(config.getenv('OUTBOX_BASE_BACKOFF', 1))
+OUTBOX_MAX_BACKOFF = float(config.getenv('OUTBOX_MAX_BACKOFF', 300))
+
+MAX_MESSAGE_LENGTH = 4096
+MESSAGE_SEPARATOR = '\n\n'
+DRAIN_CHECK_INTERVAL = 0.05
+
+Sender = Callable[[int, str], Awaitable[object]]
+
+SEND_LATENCY = metrics.histogram(
+    'telegram_send_seconds',
+    'Время отправки telegram сообщения по результату.',
+    ('result',)
+)
+
+logger = logging.getLogger(__name__)
+
+
+def telegram_error(name: str) -> type:
+    """Класс исключения telegram.error по имени.
+
+    Модуль импортируется при первой ошибке отправки, а не при запуске:
+    выражение в except вычисляется только когда исключение уже возникло.
+    """
+    from telegram import error
+    return getattr(error, name)
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """Полное ведро на capacity токенов."""
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def delay(self) -> float:
+        """Секунд до появления токена, 0 - если токен есть."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        """Списание одного токена."""
+        self._refill()
+        self.tokens -= 1
+
+
+def coalesce(messages: List[str]) -> Tuple[str, List[str]]:
+    """Склейка сообщений в одно в пределах лимита длины Telegram."""
+    text = messages[0]
+    taken = 1
+    for message in messages[1:]:
+        candidate = text + MESSAGE_SEPARATOR + message
+        if len(candidate) > MAX_MESSAGE_LENGTH:
+            break
+        text = candidate
+        taken += 1
+    return text, messages[taken:]
+
+
+class Outbox:
+    """Очередь между parse_status и ботом.
+
+    Сообщения одного чата, ожидающие отправки, склеиваются в одно.
+    Частота отправки ограничивается ведрами токенов на чат и общим.
+    RetryAfter выполняется точно, прочие сетевые ошибки повторяются
+    с экспоненциальной задержкой, BadRequest и Unauthorized - нет.
+    """
+
+    def __init__(
+        self,
+        send: Sender,
+        global_rate: float = OUTBOX_GLOBAL_RATE,
+        chat_rate: float = OUTBOX_CHAT_RATE,
+        chat_burst: float = OUTBOX_CHAT_BURST,
+        concurrency: int = OUTBOX_CONCURRENCY,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        base_backoff: float = OUTBOX_BASE_BACKOFF,
+        max_backoff: float = OUTBOX_MAX_BACKOFF,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """Очередь, отправляющая сообщения функцией send."""
+        self.send = send
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.global_bucket = TokenBucket(global_rate, global_rate, clock)
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+        self.pending: Dict[int, List[str]] = defaultdict(list)
+        self.attempts: Dict[int, int] = {}
+        self.inflight: Set[int] = set()
+        self._heap: List[Tuple[float, int, int]] = []
+        self._counter = itertools.count()
+        self._scheduled: Set[int] = set()
+        self._wakeup = None
+
+    def __len__(self) -> int:
+        """Число сообщений в очереди.
+
+        Вызывается и из потока /metrics, пока цикл меняет pending,
+        поэтому считается по снимку.
+        """
+        return sum(map(len, list(self.pending.values())))
+
+    def _schedule(self, chat_id: int, delay: float = 0) -> None:
+        if chat_id in self._scheduled or chat_id in self.inflight:
+            return
+        self._scheduled.add(chat_id)
+        heapq.heappush(
+            self._heap,
+            (self.clock() + delay, next(self._counter), chat_id)
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def put(self, chat_id: int, message: str) -> None:
+        """Постановка сообщения в очередь без ожидания отправки."""
+        self.pending[chat_id].append(message)
+        self._schedule(chat_id)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst, self.clock)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.base_backoff * 2 ** (attempt - 1), self.max_backoff)
+        return random.uniform(delay / 2, delay)
+
+    async def _next_chat(self) -> int:
+        while True:
+            delay = None
+            if self._heap:
+                ready_at, _, chat_id = self._heap[0]
+                now = self.clock()
+                delay = ready_at - now
+                if delay <= 0:
+                    chat_delay = self._chat_bucket(chat_id).delay()
+                    if chat_delay > 0:
+                        heapq.heapreplace(
+                            self._heap,
+                            (now + chat_delay, next(self._counter), chat_id)
+                        )
+                        continue
+                    delay = self.global_bucket.delay()
+                    if delay <= 0:
+                        heapq.heappop(self._heap)
+                        self._scheduled.discard(chat_id)
+                        return chat_id
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def deliver(self, chat_id: int) -> None:
+        """Отправка накопленных сообщений чата одним сообщением.
+
+        При отмене задачи текст возвращается в очередь: повторная
+        отправка после перезапуска лучше потери уведомления.
+        """
+        text, rest = coalesce(self.pending.pop(chat_id))
+        self.global_bucket.take()
+        self._chat_bucket(chat_id).take()
+        self.inflight.add(chat_id)
+        retry_in = 0
+        result = 'ok'
+        started = time.perf_counter()
+        try:
+            logger.info('Бот начал отправку telegram сообщения: %s', text)
+            await self.send(chat_id, text)
+        except asyncio.CancelledError:
+            result = 'cancelled'
+            self._requeue(chat_id, [text, *rest])
+            raise
+        except telegram_error('RetryAfter') as error:
+            result = 'retry_after'
+            retry_in = error.retry_after
+            logger.warning(
+                'Превышен лимит Telegram для чата %s. Повтор через %s с.',
+                chat_id, retry_in
+            )
+        except (
+            telegram_error('BadRequest'), telegram_error('Unauthorized')
+        ) as error:
+            result = 'dropped'
+            logger.error(
+                'Сообщение в чат %s отброшено: %s. Текст: %s',
+                chat_id, error, text
+            )
+        except Exception as error:
+            result = 'error'
+            attempt = self.attempts.get(chat_id, 0) + 1
+            if attempt >= self.max_attempts:
+                logger.error(
+                    'Сообщение в чат %s отброшено после %s попыток: %s. '
+                    'Текст: %s', chat_id, attempt, error, text
+                )
+            else:
+                self.attempts[chat_id] = attempt
+                retry_in = self._backoff(attempt)
+                logger.warning(
+                    'Ошибка отправки telegram сообщения: %s. '
+                    'Повтор через %.1f с.', error, retry_in
+                )
+        else:
+            self.attempts.pop(chat_id, None)
+            logger.info('Пользователю отправленно сообщение: %s', text)
+        finally:
+            self.inflight.discard(chat_id)
+            SEND_LATENCY.observe(time.perf_counter() - started, (result,))
+        if retry_in:
+            rest.insert(0, text)
+        else:
+            self.attempts.pop(chat_id, None)
+        self._requeue(chat_id, rest, retry_in)
+
+    def _requeue(
+        self, chat_id: int, messages: List[str], delay: float = 0
+    ) -> None:
+        messages.extend(self.pending.pop(chat_id, []))
+        if messages:
+            self.pending[chat_id] = messages
+            self._schedule(chat_id, delay)
+
+    async def drain(self, timeout: float) -> int:
+        """Ожидание отправки очереди не дольше timeout секунд.
+
+        Обработчики run() должны работать. Возвращает число
+        неотправленных сообщений.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (self.pending or self.inflight) and loop.time() < deadline:
+            await asyncio.sleep(DRAIN_CHECK_INTERVAL)
+        return len(self)
+
+    async def _worker(self) -> None:
+        while True:
+            chat_id = await self._next_chat()
+            await self.deliver(chat_id)
+
+    async def run(self) -> None:
+        """Запуск обработчиков очереди."""
+        self._wakeup = asyncio.Event()
+        await asyncio.gather(
+            *(self._worker() for _ in range(self.concurrency))
+        )
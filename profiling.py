@@ -0,0 +1,259 @@
+"""Время этапов цикла опроса и семплирующий профилировщик.
+
+Этапы цикла отмечаются span(), длительности последних CYCLE_HISTORY
+циклов хранятся в кольцевом буфере и пишутся в метрику по этапам.
+Профилировщик включается и выключается сигналом PROFILE_SIGNAL и при
+выключении сохраняет стеки в свернутом формате flamegraph.pl:
+    kill -USR2 <pid>  # старт
+    kill -USR2 <pid>  # стоп, запись profile-<pid>-<время>.folded
+    flamegraph.pl profile-*.folded > profile.svg
+"""
+import collections
+import contextlib
+import contextvars
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Counter, Deque, Dict, Iterator, List, Optional
+
+import config
+import metrics
+
+CYCLE_HISTORY = int(config.getenv('CYCLE_HISTORY', 100))
+SLOW_CYCLE_SECONDS = float(config.getenv('SLOW_CYCLE_SECONDS', 30))
+PROFILE_SIGNAL = config.getenv('PROFILE_SIGNAL', 'SIGUSR2')
+PROFILE_INTERVAL = float(config.getenv('PROFILE_INTERVAL', 0.005))
+PROFILE_DIR = config.getenv('PROFILE_DIR', '.')
+
+STAGE_LATENCY = metrics.histogram(
+    'cycle_stage_seconds',
+    'Время этапа цикла опроса.',
+    ('stage',)
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CycleTiming:
+    """Длительности этапов одного цикла, с."""
+
+    __slots__ = ('cycle', 'started', 'total', 'stages')
+
+    def __init__(self, cycle: int) -> None:
+        """Начало учета цикла с номером cycle."""
+        self.cycle = cycle
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Учет времени этапа, повторные вызовы суммируются."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def breakdown(self) -> str:
+        """Этапы по убыванию времени для журнала."""
+        return ', '.join(
+            f'{stage} {seconds * 1000:.0f} мс'
+            for stage, seconds in sorted(
+                self.stages.items(), key=lambda item: -item[1]
+            )
+        )
+
+
+class CycleTimer:
+    """Кольцевой буфер времени этапов последних циклов.
+
+    Текущий цикл хранится в переменной контекста, поэтому span() в
+    другом потоке или без начатого цикла ничего не учитывает.
+    """
+
+    def __init__(
+        self,
+        size: int = CYCLE_HISTORY,
+        slow: float = SLOW_CYCLE_SECONDS
+    ) -> None:
+        """Буфер на size циклов, медленный цикл дольше slow секунд."""
+        self.cycles: Deque[CycleTiming] = collections.deque(maxlen=size)
+        self.slow = slow
+        self._current = contextvars.ContextVar('cycle_timing', default=None)
+
+    def start(self, cycle: int) -> CycleTiming:
+        """Начало цикла с номером cycle."""
+        timing = CycleTiming(cycle)
+        self._current.set(timing)
+        return timing
+
+    @contextlib.contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Учет времени блока как этапа stage текущего цикла."""
+        timing = self._current.get()
+        if timing is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing.add(stage, time.perf_counter() - started)
+
+    def finish(self) -> Optional[CycleTiming]:
+        """Завершение цикла: буфер, метрика и предупреждение о медленном."""
+        timing = self._current.get()
+        if timing is None:
+            return None
+        self._current.set(None)
+        timing.total = time.perf_counter() - timing.started
+        self.cycles.append(timing)
+        for stage, seconds in timing.stages.items():
+            STAGE_LATENCY.observe(seconds, (stage,))
+        if self.slow and timing.total > self.slow:
+            logger.warning(
+                'Медленный цикл %s: %.1f с (%s)',
+                timing.cycle, timing.total, timing.breakdown()
+            )
+        return timing
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Среднее и максимум по этапам за циклы в буфере, с."""
+        stages: Dict[str, List[float]] = collections.defaultdict(list)
+        for timing in list(self.cycles):
+            stages['total'].append(timing.total)
+            for stage, seconds in timing.stages.items():
+                stages[stage].append(seconds)
+        return {
+            stage: {
+                'mean': sum(values) / len(values),
+                'max': max(values),
+            }
+            for stage, values in stages.items()
+        }
+
+
+TIMINGS = CycleTimer()
+
+
+def collapse(frame, thread_name: str) -> str:
+    """Стек кадра одной строкой формата flamegraph: корень слева."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f'{code.co_name} ({os.path.basename(code.co_filename)}'
+            f':{code.co_firstlineno})'
+        )
+        frame = frame.f_back
+    names.append(thread_name)
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """Семплирование стеков всех потоков из фонового потока.
+
+    Работа процесса не останавливается: стеки снимаются через
+    sys._current_frames() каждые interval секунд.
+    """
+
+    def __init__(
+        self,
+        interval: float = PROFILE_INTERVAL,
+        directory: str = PROFILE_DIR,
+        timings: Optional[CycleTimer] = None
+    ) -> None:
+        """Профилировщик со снимками каждые interval секунд."""
+        self.interval = interval
+        self.directory = directory
+        self.timings = timings
+        self.samples: Counter[str] = collections.Counter()
+        self.path: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Идет ли семплирование."""
+        return self._thread is not None and not self._stop.is_set()
+
+    def start(self) -> None:
+        """Запуск семплирования."""
+        if self.running:
+            return
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='profiler', daemon=True
+        )
+        self._thread.start()
+        logger.info('Профилировщик запущен')
+
+    def stop(self) -> None:
+        """Остановка, файл пишет поток профилировщика."""
+        self._stop.set()
+
+    def toggle(self, *args) -> None:
+        """Обработчик сигнала: запуск или остановка."""
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def join(self) -> None:
+        """Ожидание записи файла после остановки."""
+        if self._thread is not None:
+            self._thread.join()
+
+    def sample(self) -> None:
+        """Один снимок стеков всех потоков, кроме своего."""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident != own:
+                name = names.get(ident, str(ident))
+                self.samples[collapse(frame, name)] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+        try:
+            self.path = self.dump()
+        except OSError as error:
+            logger.error('Профиль не сохранен: %s', error)
+            return
+        logger.info(
+            'Профиль сохранен: %s, снимков: %s',
+            self.path, sum(self.samples.values())
+        )
+        if self.timings is not None:
+            logger.info(
+                'Время этапов за последние циклы, с: %s',
+                self.timings.summary()
+            )
+
+    def dump(self) -> str:
+        """Запись стеков в свернутом формате, возвращает путь файла."""
+        path = os.path.join(
+            self.directory,
+            f'profile-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S")}.folded'
+        )
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.samples.most_common():
+                file.write(f'{stack} {count}\n')
+        return path
+
+
+def install_profiler(
+    signal_name: str = PROFILE_SIGNAL, timings: Optional[CycleTimer] = TIMINGS
+) -> Optional[SamplingProfiler]:
+    """Переключение профилировщика сигналом signal_name.
+
+    Без поддержки сигнала (Windows) или при пустом имени ничего не делает.
+    Вызывается из главного потока.
+    """
+    signum = getattr(signal, signal_name, None) if signal_name else None
+    if signum is None:
+        return None
+    profiler = SamplingProfiler(timings=timings)
+    signal.signal(signum, profiler.toggle)
+    return profiler
@@ -0,0 +1,69 @@
+"""Компактные записи конвейера опроса вместо словарей ответа API."""
+import sys
+from enum import Enum
+from typing import Optional, Union
+
+
+class HomeworkStatus(str, Enum):
+    """Известный статус ДЗ.
+
+    Члены перечисления равны и хешируются как их строковые значения,
+    поэтому работают ключами VERDICTS и сохраняются в хранилище как есть.
+    """
+
+    APPROVED = 'approved'
+    REVIEWING = 'reviewing'
+    REJECTED = 'rejected'
+
+    __hash__ = str.__hash__
+
+    def __str__(self) -> str:
+        """Значение статуса, как в ответе API."""
+        return self.value
+
+
+Status = Union[HomeworkStatus, str]
+
+
+def intern_status(value: str) -> Status:
+    """Член HomeworkStatus или интернированная строка для неизвестных."""
+    try:
+        return HomeworkStatus(value)
+    except ValueError:
+        return sys.intern(value)
+
+
+class Homework:
+    """Название и статус ДЗ из ответа API."""
+
+    __slots__ = ('name', 'status')
+
+    def __init__(self, name: str, status: Status) -> None:
+        """Запись ДЗ из названия и статуса."""
+        self.name = name
+        self.status = status
+
+    def __eq__(self, other: object) -> bool:
+        """Равенство по названию и статусу."""
+        if not isinstance(other, Homework):
+            return NotImplemented
+        return (self.name, self.status) == (other.name, other.status)
+
+    def __repr__(self) -> str:
+        """Представление для журнала и отладки."""
+        return f'Homework({self.name!r}, {str(self.status)!r})'
+
+
+class StatusEvent:
+    """Изменение статуса ДЗ относительно последнего известного."""
+
+    __slots__ = ('homework', 'previous')
+
+    def __init__(self, homework: Homework, previous: Optional[Status]) -> None:
+        """Событие для ДЗ и его прошлого статуса."""
+        self.homework = homework
+        self.previous = previous
+
+    def __repr__(self) -> str:
+        """Представление для журнала и отладки."""
+        return f'StatusEvent({self.homework!r}, previous={self.previous!r})'
@@ -0,0 +1,140 @@
+"""Кэш ответов API Практикума с условными запросами.
+
+Для каждого токена хранится последний разобранный ответ, его
+валидаторы (ETag, Last-Modified) и хеш тела. Повторный запрос с той же
+отметкой в течение ttl не уходит в сеть, а ответ 304 или тело,
+совпадающее байт в байт с прошлым, не разбирается заново.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+import config
+import metrics
+from decoder import parse_answer
+
+if TYPE_CHECKING:
+    import requests
+
+RESPONSE_CACHE_TTL = float(config.getenv('RESPONSE_CACHE_TTL', 5))
+RESPONSE_CACHE_SIZE = int(config.getenv('RESPONSE_CACHE_SIZE', 100000))
+
+CACHE_RESULTS = metrics.counter(
+    'response_cache_total',
+    'Ответы API по результату проверки кэша.',
+    ('result',)
+)
+
+
+class CachedResponse:
+    """Последний ответ API для токена."""
+
+    def __init__(
+        self,
+        from_date: int,
+        data: object,
+        digest: bytes,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        stored_at: float
+    ) -> None:
+        """Ответ API с отметкой, отпечатком тела и ETag."""
+        self.from_date = from_date
+        self.data = data
+        self.digest = digest
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+    def validators(self) -> Dict[str, str]:
+        """Заголовки условного запроса."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """Ограниченный по размеру кэш последних ответов по токенам."""
+
+    def __init__(
+        self,
+        ttl: float = RESPONSE_CACHE_TTL,
+        max_entries: int = RESPONSE_CACHE_SIZE,
+        decode: Callable[[bytes], object] = parse_answer,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """Кэш на ttl секунд, не больше max_entries токенов."""
+        self.ttl = ttl
+        self.decode = decode
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: 'OrderedDict[str, CachedResponse]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Число токенов в кэше."""
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[CachedResponse]:
+        """Последний ответ для токена."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                self._entries.move_to_end(token)
+            return entry
+
+    def is_fresh(self, entry: CachedResponse, from_date: int) -> bool:
+        """Можно ли отдать ответ без запроса к API."""
+        fresh = (
+            entry.from_date == from_date
+            and self.clock() - entry.stored_at < self.ttl
+        )
+        if fresh:
+            CACHE_RESULTS.inc(('fresh',))
+        return fresh
+
+    def store(
+        self, token: str, from_date: int, response: 'requests.Response'
+    ) -> Tuple[object, bool]:
+        """Разбор ответа с учетом кэша.
+
+        Возвращает данные ответа и признак того, что они отличаются
+        от прошлого ответа для токена.
+        """
+        entry = self.get(token)
+        not_modified = response.status_code == HTTPStatus.NOT_MODIFIED
+        if entry is not None and not_modified:
+            return self._touch(entry, from_date, 'not_modified'), False
+        digest = hashlib.blake2b(response.content, digest_size=16).digest()
+        if entry is not None and digest == entry.digest:
+            return self._touch(entry, from_date, 'identical'), False
+        data = self.decode(response.content)
+        CACHE_RESULTS.inc(('miss',))
+        entry = CachedResponse(
+            from_date,
+            data,
+            digest,
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            self.clock()
+        )
+        with self._lock:
+            self._entries[token] = entry
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return data, True
+
+    def _touch(
+        self, entry: CachedResponse, from_date: int, result: str
+    ) -> object:
+        entry.from_date = from_date
+        entry.stored_at = self.clock()
+        CACHE_RESULTS.inc((result,))
+        return entry.data
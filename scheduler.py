@@ -0,0 +1,117 @@
+"""Адаптивный планировщик опросов на основе кучи таймеров."""
+import heapq
+import itertools
+import random
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import config
+
+MIN_POLL_INTERVAL = float(config.getenv('MIN_POLL_INTERVAL', 60))
+MAX_POLL_INTERVAL = float(config.getenv('MAX_POLL_INTERVAL', 1800))
+POLL_BACKOFF = float(config.getenv('POLL_BACKOFF', 1.5))
+POLL_JITTER = float(config.getenv('POLL_JITTER', 0.1))
+
+
+class AdaptiveScheduler:
+    """Планировщик: интервал опроса зависит от активности проверки.
+
+    После изменения статуса или пока работа на проверке подписка
+    опрашивается с минимальным интервалом. Без изменений интервал
+    растет в POLL_BACKOFF раз до максимального. Каждое планирование
+    стоит O(log n): устаревшие записи кучи пропускаются при извлечении.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = MIN_POLL_INTERVAL,
+        max_interval: float = MAX_POLL_INTERVAL,
+        backoff: float = POLL_BACKOFF,
+        jitter: float = POLL_JITTER,
+        initial_interval: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """Пустое расписание с границами интервала опроса."""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.initial_interval = initial_interval or max_interval
+        self.clock = clock
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._counter = itertools.count()
+        self._entries: Dict[Hashable, int] = {}
+        self._intervals: Dict[Hashable, float] = {}
+        self._items: Dict[Hashable, object] = {}
+        self.lag = 0.0
+
+    def __len__(self) -> int:
+        """Число ключей в расписании."""
+        return len(self._items)
+
+    def _jittered(self, interval: float) -> float:
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def schedule(self, key: Hashable, item: object, delay: float) -> None:
+        """Планирование опроса через delay секунд."""
+        seq = next(self._counter)
+        self._entries[key] = seq
+        self._items[key] = item
+        self._intervals.setdefault(key, self.initial_interval)
+        heapq.heappush(self._heap, (self.clock() + delay, seq, key))
+
+    def add(self, key: Hashable, item: object) -> None:
+        """Добавление подписки с опросом в случайный момент окна."""
+        self.schedule(key, item, random.uniform(0, self.min_interval))
+
+    def remove(self, key: Hashable) -> None:
+        """Удаление подписки из расписания."""
+        self._entries.pop(key, None)
+        self._intervals.pop(key, None)
+        self._items.pop(key, None)
+
+    def next_interval(
+        self, key: Hashable, changed: bool, active: bool
+    ) -> float:
+        """Следующий интервал по наблюдаемой активности проверки."""
+        if changed or active:
+            return self.min_interval
+        interval = self._intervals.get(key, self.initial_interval)
+        return min(
+            max(interval, self.min_interval) * self.backoff,
+            self.max_interval
+        )
+
+    def reschedule(self, key: Hashable, changed: bool, active: bool) -> float:
+        """Перепланирование после опроса, возвращает выбранный интервал."""
+        if key not in self._items:
+            return 0
+        interval = self.next_interval(key, changed, active)
+        self._intervals[key] = interval
+        self.schedule(key, self._items[key], self._jittered(interval))
+        return interval
+
+    def pop_due(self) -> List[object]:
+        """Извлечение всех подписок, время опроса которых наступило.
+
+        В lag сохраняется наибольшее опоздание среди извлеченных.
+        """
+        now = self.clock()
+        due = []
+        self.lag = 0.0
+        while self._heap and self._heap[0][0] <= now:
+            deadline, seq, key = heapq.heappop(self._heap)
+            if self._entries.get(key) == seq:
+                del self._entries[key]
+                due.append(self._items[key])
+                self.lag = max(self.lag, now - deadline)
+        return due
+
+    def time_until_next(self) -> Optional[float]:
+        """Секунд до ближайшего запланированного опроса."""
+        while self._heap:
+            deadline, seq, key = self._heap[0]
+            if self._entries.get(key) == seq:
+                return max(deadline - self.clock(), 0)
+            heapq.heappop(self._heap)
+        return None
@@ -0,0 +1,435 @@
+"""Долговременное хранилище состояния подписок."""
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+STATE_BACKEND = config.getenv('STATE_BACKEND', 'sqlite')
+STATE_PATH = config.getenv('STATE_PATH', 'homework_state.sqlite3')
+STATE_FLUSH_INTERVAL = float(config.getenv('STATE_FLUSH_INTERVAL', 5))
+STATE_BATCH_SIZE = int(config.getenv('STATE_BATCH_SIZE', 500))
+STATE_LOG_MAX_BYTES = int(
+    config.getenv('STATE_LOG_MAX_BYTES', 10 * 1024 * 1024)
+)
+
+CURSOR = 'cursor'
+STATUS = 'status'
+DELIVERY = 'delivery'
+UNDELIVERED = 'undelivered'
+
+Record = Tuple[str, str, Optional[str], object]
+
+logger = logging.getLogger(__name__)
+
+
+def token_digest(token: str) -> str:
+    """Короткий отпечаток токена для ключей и журналов."""
+    return hashlib.sha256(str(token).encode()).hexdigest()[:16]
+
+
+def subscription_id(token: str, chat_id: int) -> str:
+    """Идентификатор подписки без раскрытия токена."""
+    return f'{chat_id}:{token_digest(token)}'
+
+
+class StateStore:
+    """Базовое хранилище: чтение из памяти, пакетная запись на диск.
+
+    Методы set_* только обновляют память и ставят запись в очередь.
+    На диск очередь сбрасывает flush(), который вызывается вне цикла
+    опроса: по таймеру или при превышении STATE_BATCH_SIZE записей.
+    Очередь меняется только под _queue_lock, поэтому flush() в другом
+    потоке не теряет записи, поставленные во время сброса.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = STATE_FLUSH_INTERVAL,
+        batch_size: int = STATE_BATCH_SIZE
+    ) -> None:
+        """Пустое хранилище с параметрами пакетной записи."""
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.cursors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[str, str]] = defaultdict(dict)
+        self.deliveries: Dict[str, str] = {}
+        self.undelivered: Dict[Tuple[int, str], List[str]] = {}
+        self._pending: List[Record] = []
+        self._lock = threading.Lock()
+        self._queue_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def get_cursor(self, sub_id: str) -> Optional[int]:
+        """Сохраненная отметка опроса подписки."""
+        return self.cursors.get(sub_id)
+
+    def set_cursor(self, sub_id: str, from_date: int) -> None:
+        """Обновление отметки опроса подписки."""
+        with self._queue_lock:
+            if self.cursors.get(sub_id) != from_date:
+                self.cursors[sub_id] = from_date
+                self._pending.append((CURSOR, sub_id, None, from_date))
+
+    def get_statuses(self, sub_id: str) -> Dict[str, str]:
+        """Последние известные статусы ДЗ подписки."""
+        return self.statuses[sub_id]
+
+    def read_statuses(self, sub_id: str) -> Dict[str, str]:
+        """Статусы ДЗ с учетом записей других процессов."""
+        return dict(self.statuses.get(sub_id, {}))
+
+    def set_status(self, sub_id: str, homework_name: str, status: str) -> None:
+        """Обновление последнего известного статуса ДЗ."""
+        with self._queue_lock:
+            statuses = self.statuses[sub_id]
+            if statuses.get(homework_name) != status:
+                statuses[homework_name] = status
+                self._pending.append((STATUS, sub_id, homework_name, status))
+
+    def get_delivery(self, sub_id: str) -> Optional[str]:
+        """Последнее отправленное подписке сообщение."""
+        return self.deliveries.get(sub_id)
+
+    def set_delivery(self, sub_id: str, message: str) -> None:
+        """Обновление последнего отправленного сообщения."""
+        with self._queue_lock:
+            if self.deliveries.get(sub_id) != message:
+                self.deliveries[sub_id] = message
+                self._pending.append((DELIVERY, sub_id, None, message))
+
+    def get_undelivered(self) -> Dict[Tuple[int, str], List[str]]:
+        """Сообщения, не отправленные до прошлой остановки.
+
+        Ключ - чат и владелец: отпечаток токена, по которому процессы
+        supervisor делят подписки.
+        """
+        return {
+            key: list(messages)
+            for key, messages in self.undelivered.items()
+        }
+
+    def set_undelivered(
+        self, chat_id: int, owner: str, messages: List[str]
+    ) -> None:
+        """Сохранение неотправленных сообщений чата, пустой список удаляет."""
+        messages = list(messages)
+        with self._queue_lock:
+            if self.undelivered.get((chat_id, owner), []) != messages:
+                self._set_undelivered(chat_id, owner, messages)
+                self._pending.append(
+                    (UNDELIVERED, str(chat_id), owner, messages)
+                )
+
+    def _set_undelivered(
+        self, chat_id: int, owner: str, messages: List[str]
+    ) -> None:
+        if messages:
+            self.undelivered[chat_id, owner] = messages
+        else:
+            self.undelivered.pop((chat_id, owner), None)
+
+    def _apply(self, record: Record) -> None:
+        kind, sub_id, key, value = record
+        if kind == CURSOR:
+            self.cursors[sub_id] = value
+        elif kind == STATUS:
+            self.statuses[sub_id][key] = value
+        elif kind == DELIVERY:
+            self.deliveries[sub_id] = value
+        elif kind == UNDELIVERED:
+            self._set_undelivered(int(sub_id), key, value)
+
+    def flush_due(self) -> bool:
+        """Пора ли сбрасывать накопленные записи на диск."""
+        return bool(self._pending) and (
+            len(self._pending) >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def flush(self) -> None:
+        """Запись накопленных изменений одним пакетом.
+
+        Если запись не удалась, пакет возвращается в начало очереди
+        и будет записан следующим flush().
+        """
+        with self._lock:
+            with self._queue_lock:
+                records, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not records:
+                return
+            try:
+                self._persist(records)
+            except Exception:
+                with self._queue_lock:
+                    self._pending[:0] = records
+                raise
+
+    def close(self) -> None:
+        """Сброс изменений и закрытие хранилища."""
+        self.flush()
+
+    def _persist(self, records: List[Record]) -> None:
+        raise NotImplementedError
+
+
+class MemoryStateStore(StateStore):
+    """Хранилище без записи на диск."""
+
+    def _persist(self, records: List[Record]) -> None:
+        pass
+
+
+class SQLiteStateStore(StateStore):
+    """Хранилище в SQLite: одна транзакция на пакет записей."""
+
+    def __init__(self, path: str, **kwargs) -> None:
+        """Открытие базы path и загрузка состояния в память."""
+        super().__init__(**kwargs)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'CREATE TABLE IF NOT EXISTS cursors ('
+            ' sub_id TEXT PRIMARY KEY, from_date INTEGER NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS statuses ('
+            ' sub_id TEXT NOT NULL, homework_name TEXT NOT NULL,'
+            ' status TEXT NOT NULL, PRIMARY KEY (sub_id, homework_name));'
+            'CREATE TABLE IF NOT EXISTS deliveries ('
+            ' sub_id TEXT PRIMARY KEY, message TEXT NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS undelivered_messages ('
+            ' chat_id TEXT NOT NULL, owner TEXT NOT NULL,'
+            ' messages TEXT NOT NULL, PRIMARY KEY (chat_id, owner));'
+        )
+        self._load()
+
+    def _load(self) -> None:
+        execute = self.connection.execute
+        for sub_id, from_date in execute('SELECT * FROM cursors'):
+            self.cursors[sub_id] = from_date
+        for sub_id, name, status in execute('SELECT * FROM statuses'):
+            self.statuses[sub_id][name] = status
+        for sub_id, message in execute('SELECT * FROM deliveries'):
+            self.deliveries[sub_id] = message
+        for chat_id, owner, messages in execute(
+            'SELECT * FROM undelivered_messages'
+        ):
+            self._set_undelivered(int(chat_id), owner, json.loads(messages))
+
+    def read_statuses(self, sub_id: str) -> Dict[str, str]:
+        """Статусы ДЗ из базы: их могли записать другие процессы.
+
+        Поверх строк базы кладутся только еще не записанные изменения
+        этого процесса: остальное в памяти может быть устаревшим
+        снимком подписок другого процесса.
+        """
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT homework_name, status FROM statuses WHERE sub_id = ?',
+                (sub_id,)
+            ).fetchall()
+            with self._queue_lock:
+                unflushed = [
+                    (key, value)
+                    for kind, record_id, key, value in self._pending
+                    if kind == STATUS and record_id == sub_id
+                ]
+        statuses = dict(rows)
+        statuses.update(unflushed)
+        return statuses
+
+    def _persist(self, records: List[Record]) -> None:
+        with self.connection:
+            for kind, sub_id, key, value in records:
+                if kind == CURSOR:
+                    self.connection.execute(
+                        'INSERT OR REPLACE INTO cursors VALUES (?, ?)',
+                        (sub_id, value)
+                    )
+                elif kind == STATUS:
+                    self.connection.execute(
+                        'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?)',
+                        (sub_id, key, value)
+                    )
+                elif kind == DELIVERY:
+                    self.connection.execute(
+                        'INSERT OR REPLACE INTO deliveries VALUES (?, ?)',
+                        (sub_id, value)
+                    )
+                elif kind == UNDELIVERED and value:
+                    self.connection.execute(
+                        'INSERT OR REPLACE INTO undelivered_messages '
+                        'VALUES (?, ?, ?)',
+                        (sub_id, key, json.dumps(value, ensure_ascii=False))
+                    )
+                elif kind == UNDELIVERED:
+                    self.connection.execute(
+                        'DELETE FROM undelivered_messages '
+                        'WHERE chat_id = ? AND owner = ?',
+                        (sub_id, key)
+                    )
+
+    def close(self) -> None:
+        """Сброс изменений и закрытие соединения."""
+        super().close()
+        self.connection.close()
+
+
+class FileStateStore(StateStore):
+    """Хранилище в append-only JSONL файле: один fsync на пакет записей.
+
+    Журнал могут дописывать несколько процессов supervisor. Когда он
+    превышает max_bytes, и при закрытии журнал заменяется снимком,
+    собранным из самого файла, а не из памяти процесса, поэтому записи
+    других процессов сохраняются. Запись идет под общей блокировкой
+    файла PATH.lock, замена - под исключительной; процесс, чей журнал
+    заменили, перед записью открывает новый файл.
+    """
+
+    def __init__(
+        self, path: str, max_bytes: int = STATE_LOG_MAX_BYTES, **kwargs
+    ) -> None:
+        """Загрузка журнала path и открытие его для дозаписи."""
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._compact_at = max_bytes
+        self._lock_file = open(path + '.lock', 'a')
+        with self._file_lock(exclusive=False):
+            for record in self._read():
+                self._apply(record)
+            self.file = open(path, 'a', encoding='utf-8')
+
+    @contextlib.contextmanager
+    def _file_lock(self, exclusive: bool) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(
+            self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        )
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> Iterator[Record]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    yield tuple(json.loads(line))
+                except ValueError:
+                    logger.warning(
+                        'Пропущена поврежденная запись состояния: %r', line
+                    )
+
+    def _reopen_if_replaced(self) -> None:
+        try:
+            inode = os.stat(self.path).st_ino
+            replaced = inode != os.fstat(self.file.fileno()).st_ino
+        except FileNotFoundError:
+            replaced = True
+        if replaced:
+            self.file.close()
+            self.file = open(self.path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def _dump(records: Iterable[Record]) -> str:
+        return ''.join(
+            json.dumps(record, ensure_ascii=False) + '\n'
+            for record in records
+        )
+
+    def _persist(self, records: List[Record]) -> None:
+        with self._file_lock(exclusive=False):
+            self._reopen_if_replaced()
+            self.file.write(self._dump(records))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            size = self.file.tell()
+        if size > self._compact_at:
+            self._try_compact()
+
+    def _snapshot(self) -> List[Record]:
+        latest: Dict[Tuple[str, str, Optional[str]], Record] = {}
+        for record in self._read():
+            kind, sub_id, key, value = record
+            latest[kind, sub_id, key] = record
+        return [
+            record for record in latest.values()
+            if record[0] != UNDELIVERED or record[3]
+        ]
+
+    def compact(self) -> None:
+        """Замена журнала снимком состояния из этого же журнала.
+
+        Снимок пишется во временный файл рядом с журналом и атомарно
+        подменяет его, так что сбой посередине оставляет старый журнал.
+        """
+        with self._lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._file_lock(exclusive=True):
+            descriptor, temp_path = tempfile.mkstemp(
+                prefix='.state-', suffix='.tmp', dir=directory
+            )
+            try:
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                    file.write(self._dump(self._snapshot()))
+                    file.flush()
+                    os.fsync(file.fileno())
+                    size = file.tell()
+                os.replace(temp_path, self.path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+            self._reopen_if_replaced()
+        # Снимок больше порога не должен пересобираться на каждом сбросе.
+        self._compact_at = max(self.max_bytes, 2 * size)
+        logger.info('Журнал состояния сжат до %s байт', size)
+
+    def _try_compact(self) -> None:
+        try:
+            self._compact()
+        except OSError as error:
+            logger.warning('Журнал состояния не сжат: %s', error)
+
+    def close(self) -> None:
+        """Сброс изменений, сжатие журнала и закрытие файлов."""
+        super().close()
+        with self._lock:
+            self._try_compact()
+            self.file.close()
+            self._lock_file.close()
+
+
+def create_state_store(
+    backend: str = STATE_BACKEND, path: str = STATE_PATH
+) -> StateStore:
+    """Создание хранилища по имени бэкенда: sqlite, file или memory."""
+    if backend == 'sqlite':
+        return SQLiteStateStore(path)
+    if backend == 'file':
+        return FileStateStore(path)
+    if backend == 'memory':
+        return MemoryStateStore()
+    raise ValueError(f'Неизвестный бэкенд хранилища состояния: {backend}')
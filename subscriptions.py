@@ -0,0 +1,281 @@
+"""Подписки: загрузка из JSONL, CSV или SQLite, проверка и массовый импорт.
+
+Запуск из корня репозитория добавляет подписки из файлов в
+SUBSCRIPTIONS_FILE, работающие процессы подхватят их без перезапуска:
+    python subscriptions.py students.csv
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import config
+import homework
+from logging_setup import setup_logging
+from state import subscription_id, token_digest
+from templates import TEMPLATES
+
+SUBSCRIPTIONS_FILE = config.getenv('SUBSCRIPTIONS_FILE', 'subscriptions.jsonl')
+SUBSCRIPTIONS_TABLE = 'subscriptions'
+SQLITE_SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+NO_SUBSCRIPTIONS_MESSAGE = (
+    'Программа принудительно остановлена. Нет подписок: задайте '
+    'SUBSCRIPTIONS_FILE или переменные окружения PRACT_TOKEN, TOKEN и CHAT_ID.'
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Подписка чата на статусы ДЗ по токену Практикума."""
+
+    __slots__ = (
+        'token', 'chat_id', 'id', 'token_key', 'locale', 'from_date',
+        'previous_message'
+    )
+
+    def __init__(
+        self, token: str, chat_id: int, locale: Optional[str] = None
+    ) -> None:
+        """Подписка чата chat_id по токену на языке locale."""
+        self.token = token
+        self.chat_id = chat_id
+        self.locale = locale
+        self.id = subscription_id(token, chat_id)
+        self.token_key = token_digest(token)
+        self.from_date = homework.initial_from_date()
+        self.previous_message = ''
+
+    def __repr__(self) -> str:
+        """Представление без токена."""
+        return f'Subscription(chat_id={self.chat_id})'
+
+    def as_record(self) -> dict:
+        """Запись для файла подписок."""
+        record = {'token': self.token, 'chat_id': self.chat_id}
+        if self.locale:
+            record['locale'] = self.locale
+        return record
+
+
+def read_jsonl(path: str) -> Iterable[dict]:
+    """Записи из JSONL файла, пустые строки пропускаются."""
+    with open(path, encoding='utf-8') as file:
+        for number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield {'line': number}
+
+
+def read_csv(path: str) -> Iterable[dict]:
+    """Записи из CSV файла с колонками token, chat_id и locale."""
+    with open(path, encoding='utf-8', newline='') as file:
+        yield from csv.DictReader(file)
+
+
+def read_sqlite(path: str) -> Iterable[dict]:
+    """Записи из таблицы subscriptions базы SQLite."""
+    connection = sqlite3.connect(path)
+    connection.row_factory = sqlite3.Row
+    try:
+        rows = connection.execute(
+            f'SELECT * FROM {SUBSCRIPTIONS_TABLE}'
+        ).fetchall()
+    finally:
+        connection.close()
+    return [dict(row) for row in rows]
+
+
+def reader_for(path: str) -> Callable[[str], Iterable[dict]]:
+    """Функция чтения записей по расширению файла."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return read_csv
+    if extension in SQLITE_SUFFIXES:
+        return read_sqlite
+    return read_jsonl
+
+
+def validate(records: Iterable[dict]) -> Tuple[List[Subscription], List[str]]:
+    """Проверка всех записей сразу при загрузке.
+
+    Возвращает подписки из корректных записей без повторов и описания
+    отброшенных записей.
+    """
+    subscriptions: Dict[str, Subscription] = {}
+    errors = []
+    for number, record in enumerate(records, 1):
+        if not isinstance(record, dict):
+            errors.append(f'запись {number}: не объект')
+            continue
+        token = record.get('token')
+        locale = record.get('locale') or None
+        try:
+            chat_id = int(record.get('chat_id'))
+        except (TypeError, ValueError):
+            chat_id = None
+        if not token or not isinstance(token, str):
+            errors.append(f'запись {number}: нет токена')
+        elif chat_id is None:
+            errors.append(f'запись {number}: некорректный chat_id')
+        elif locale is not None and locale not in TEMPLATES.messages:
+            errors.append(f'запись {number}: неизвестный язык {locale}')
+        else:
+            subscription = Subscription(token.strip(), chat_id, locale)
+            subscriptions[subscription.id] = subscription
+    return list(subscriptions.values()), errors
+
+
+def env_subscriptions() -> List[Subscription]:
+    """Подписка из переменных окружения, если файла подписок нет.
+
+    Пустой список, если не заданы токены или CHAT_ID не число.
+    """
+    if not homework.check_tokens():
+        return []
+    try:
+        chat_id = int(homework.TELEGRAM_CHAT_ID)
+    except ValueError:
+        logger.error('CHAT_ID должен быть числом')
+        return []
+    return [Subscription(homework.PRACTICUM_TOKEN, chat_id)]
+
+
+def load_subscriptions(path: str) -> List[Subscription]:
+    """Загрузка подписок из JSONL, CSV или SQLite.
+
+    Строка JSONL: {"token": ..., "chat_id": ..., "locale": "ru"},
+    ключ "locale" необязателен. Некорректные записи пропускаются
+    с одним предупреждением на весь файл.
+    """
+    subscriptions, errors = validate(reader_for(path)(path))
+    if errors:
+        logger.warning(
+            'В %s пропущено записей: %s (%s)',
+            path, len(errors), '; '.join(errors[:10])
+        )
+    return subscriptions
+
+
+def write_sqlite(path: str, subscriptions: List[Subscription]) -> None:
+    """Запись подписок в таблицу subscriptions одной транзакцией."""
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {SUBSCRIPTIONS_TABLE} ('
+                ' token TEXT NOT NULL, chat_id INTEGER NOT NULL, locale TEXT,'
+                ' PRIMARY KEY (token, chat_id))'
+            )
+            connection.executemany(
+                f'INSERT OR REPLACE INTO {SUBSCRIPTIONS_TABLE} '
+                'VALUES (?, ?, ?)',
+                [(sub.token, sub.chat_id, sub.locale) for sub in subscriptions]
+            )
+    finally:
+        connection.close()
+
+
+def write_subscriptions(path: str, subscriptions: List[Subscription]) -> None:
+    """Атомарная запись подписок в JSONL файл или таблицу SQLite."""
+    if reader_for(path) is read_sqlite:
+        write_sqlite(path, subscriptions)
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+        for subscription in subscriptions:
+            file.write(json.dumps(
+                subscription.as_record(), ensure_ascii=False
+            ) + '\n')
+    os.replace(temporary, path)
+
+
+def import_subscriptions(sources: List[str], target: str) -> int:
+    """Добавление подписок из файлов в файл или базу target.
+
+    Возвращает число новых подписок.
+    """
+    current = load_subscriptions(target) if os.path.exists(target) else []
+    merged = {subscription.id: subscription for subscription in current}
+    for source in sources:
+        for subscription in load_subscriptions(source):
+            merged[subscription.id] = subscription
+    write_subscriptions(target, list(merged.values()))
+    return len(merged) - len(current)
+
+
+class SubscriptionSource:
+    """Файл подписок, перечитываемый при изменении."""
+
+    def __init__(
+        self,
+        path: str,
+        select: Callable[[List[Subscription]], List[Subscription]] = list
+    ) -> None:
+        """Источник подписок из path, select отбирает свою часть."""
+        self.path = path
+        self.select = select
+        self.subscriptions: List[Subscription] = []
+        self.chats: Dict[int, List[Subscription]] = {}
+        self._signature = None
+
+    def _stat(self) -> tuple:
+        signature = []
+        for path in (self.path, self.path + '-wal'):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def changed(self) -> bool:
+        """Изменился ли файл с прошлой загрузки."""
+        return self._stat() != self._signature
+
+    def load(self) -> List[Subscription]:
+        """Загрузка всех подписок, возвращает подписки процесса."""
+        self._signature = self._stat()
+        self.subscriptions = load_subscriptions(self.path)
+        chats: Dict[int, List[Subscription]] = {}
+        for subscription in self.subscriptions:
+            chats.setdefault(subscription.chat_id, []).append(subscription)
+        self.chats = chats
+        return self.select(self.subscriptions)
+
+    def subscription_ids(self, chat_id: int) -> List[str]:
+        """Идентификаторы подписок чата среди всех процессов."""
+        return [sub.id for sub in self.chats.get(chat_id, ())]
+
+    def locale(self, chat_id: int) -> Optional[str]:
+        """Язык чата."""
+        return next(
+            (sub.locale for sub in self.chats.get(chat_id, ())), None
+        )
+
+
+def main():
+    """Импорт подписок из файлов в SUBSCRIPTIONS_FILE."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sources', nargs='+', help='JSONL, CSV или SQLite')
+    parser.add_argument('--target', default=SUBSCRIPTIONS_FILE)
+    args = parser.parse_args()
+    added = import_subscriptions(args.sources, args.target)
+    logger.info('Добавлено подписок: %s', added)
+
+
+if __name__ == '__main__':
+    listener = setup_logging(log_file=None)
+    try:
+        main()
+    finally:
+        listener.stop()
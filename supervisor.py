@@ -0,0 +1,200 @@
+"""Запуск нескольких процессов движка с распределением подписок.
+
+Подписки распределяются по процессам консистентным хешированием:
+при изменении числа процессов на K переезжает около 1/K подписок.
+Все процессы работают с общим хранилищем состояния (SQLite).
+"""
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+import config
+from logging_setup import setup_logging
+
+WORKERS = int(config.getenv('WORKERS', 1))
+VIRTUAL_NODES = int(config.getenv('VIRTUAL_NODES', 160))
+RESTART_BACKOFF = 1
+MAX_RESTART_BACKOFF = 60
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Кольцо консистентного хеширования с виртуальными узлами."""
+
+    def __init__(
+        self, nodes: Iterable[str], virtual_nodes: int = VIRTUAL_NODES
+    ) -> None:
+        """Кольцо из virtual_nodes точек на каждый узел."""
+        points = sorted(
+            (_hash(f'{node}#{replica}'), node)
+            for node in nodes
+            for replica in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: str) -> str:
+        """Узел, которому принадлежит ключ."""
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+def worker_name(index: int) -> str:
+    """Имя процесса на кольце."""
+    return f'worker-{index}'
+
+
+def shard(
+    subscriptions: Sequence,
+    worker_index: int,
+    worker_count: int,
+    key: Callable[[Any], str] = attrgetter('id')
+) -> List:
+    """Подписки, которые обслуживает процесс worker_index.
+
+    Подписки с одинаковым key попадают в один процесс.
+    """
+    if worker_count <= 1:
+        return list(subscriptions)
+    ring = HashRing(worker_name(index) for index in range(worker_count))
+    name = worker_name(worker_index)
+    return [sub for sub in subscriptions if ring.node_for(key(sub)) == name]
+
+
+FORWARDED_SIGNALS = ('SIGHUP', 'SIGUSR1')
+
+
+def _interrupt_once(signum, frame):
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    raise KeyboardInterrupt
+
+
+def run_worker(worker_index: int, worker_count: int) -> None:
+    """Точка входа процесса движка.
+
+    Первый SIGTERM или SIGINT останавливает движок, повторные
+    игнорируются, чтобы не прервать сохранение состояния. SIGHUP и
+    SIGUSR1 игнорируются, пока движок не установит свои обработчики.
+    """
+    from engine import main
+
+    signal.signal(signal.SIGTERM, _interrupt_once)
+    signal.signal(signal.SIGINT, _interrupt_once)
+    for name in FORWARDED_SIGNALS:
+        signum = getattr(signal, name, None)
+        if signum is not None:
+            signal.signal(signum, signal.SIG_IGN)
+    listener = setup_logging()
+    try:
+        main(worker_index, worker_count)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.stop()
+
+
+class Supervisor:
+    """Запуск, перезапуск и остановка процессов движка."""
+
+    def __init__(self, workers: int = WORKERS) -> None:
+        """Надзор за workers процессами движка."""
+        self.workers = workers
+        self.context = multiprocessing.get_context('fork')
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.backoff: Dict[int, float] = {}
+        self.started: Dict[int, float] = {}
+        self.stopping = False
+        self.pid = os.getpid()
+
+    def start(self, index: int) -> None:
+        """Запуск процесса движка с номером index."""
+        process = self.context.Process(
+            target=run_worker,
+            args=(index, self.workers),
+            name=worker_name(index),
+            daemon=False
+        )
+        process.start()
+        self.processes[index] = process
+        self.started[index] = time.monotonic()
+        logger.info('Запущен %s, pid %s', process.name, process.pid)
+
+    def stop(self, *args) -> None:
+        """Остановка всех процессов по SIGTERM."""
+        self.stopping = True
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    def forward(self, signum, frame) -> None:
+        """Передача SIGHUP и SIGUSR1 процессам движка."""
+        if os.getpid() != self.pid:
+            # Процесс движка до установки своих обработчиков.
+            return
+        for process in self.processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    def run(self) -> None:
+        """Работа до получения SIGTERM или SIGINT."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for name in FORWARDED_SIGNALS:
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                signal.signal(signum, self.forward)
+        for index in range(self.workers):
+            self.start(index)
+        while not self.stopping:
+            sentinels = {
+                process.sentinel: index
+                for index, process in self.processes.items()
+            }
+            for sentinel in wait(list(sentinels), timeout=1):
+                index = sentinels[sentinel]
+                process = self.processes[index]
+                process.join()
+                if self.stopping:
+                    break
+                uptime = time.monotonic() - self.started[index]
+                if uptime > MAX_RESTART_BACKOFF:
+                    self.backoff.pop(index, None)
+                delay = self.backoff.get(index, RESTART_BACKOFF)
+                logger.error(
+                    '%s завершился с кодом %s, перезапуск через %s с.',
+                    process.name, process.exitcode, delay
+                )
+                time.sleep(delay)
+                if self.stopping:
+                    break
+                self.backoff[index] = min(delay * 2, MAX_RESTART_BACKOFF)
+                self.start(index)
+        for process in self.processes.values():
+            process.join()
+        logger.info('Все процессы движка остановлены.')
+
+
+def main():
+    """Запуск WORKERS процессов движка."""
+    Supervisor().run()
+
+
+if __name__ == '__main__':
+    listener = setup_logging()
+    try:
+        main()
+    finally:
+        listener.stop()
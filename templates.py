@@ -0,0 +1,132 @@
+"""Шаблоны сообщений о смене статуса ДЗ на нескольких языках.
+
+Шаблон каждой пары (язык, статус) собирается один раз: вердикт
+подставляется заранее, а для названия работы остаются префикс и суффикс.
+Готовые сообщения кэшируются по (язык, статус, название работы).
+"""
+import functools
+import json
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import config
+from exceptions import NotImplementedStatusException
+
+DEFAULT_LOCALE = config.getenv('DEFAULT_LOCALE', 'ru')
+CUSTOM_STATUSES_FILE = config.getenv('CUSTOM_STATUSES_FILE', 'statuses.json')
+RENDER_CACHE_SIZE = int(config.getenv('RENDER_CACHE_SIZE', 4096))
+
+MESSAGES = {
+    'ru': 'Изменился статус проверки работы "{homework_name}". {verdict}',
+    'en': 'Homework "{homework_name}" status changed. {verdict}',
+}
+LOCALE_VERDICTS = {
+    'ru': {
+        'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
+        'reviewing': 'Работа взята на проверку ревьюером.',
+        'rejected': 'Работа проверена: у ревьюера есть замечания.'
+    },
+    'en': {
+        'approved': 'Reviewed: the reviewer liked everything. Hooray!',
+        'reviewing': 'The reviewer has started reviewing the homework.',
+        'rejected': 'Reviewed: the reviewer has some remarks.'
+    },
+}
+
+NAME_MARK = '\0'
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateRegistry:
+    """Шаблоны сообщений по языкам и статусам ДЗ."""
+
+    def __init__(
+        self,
+        messages: Dict[str, str] = MESSAGES,
+        verdicts: Dict[str, Dict[str, str]] = LOCALE_VERDICTS,
+        default_locale: str = DEFAULT_LOCALE,
+        cache_size: int = RENDER_CACHE_SIZE
+    ) -> None:
+        """Реестр шаблонов и вердиктов по языкам."""
+        self.messages = dict(messages)
+        self.verdicts = {
+            locale: dict(locale_verdicts)
+            for locale, locale_verdicts in verdicts.items()
+        }
+        self.default_locale = default_locale
+        self._compiled: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        self._render = functools.lru_cache(maxsize=cache_size)(
+            self._render_uncached
+        )
+        self.compile()
+
+    def compile(self) -> None:
+        """Сборка шаблонов всех пар (язык, статус)."""
+        compiled = {}
+        for locale, message in self.messages.items():
+            for status, verdict in self._locale_verdicts(locale).items():
+                prefix, suffix = message.format(
+                    homework_name=NAME_MARK, verdict=verdict
+                ).split(NAME_MARK)
+                compiled[locale, status] = prefix, suffix
+        self._compiled = compiled
+        self._render.cache_clear()
+
+    def _locale_verdicts(self, locale: str) -> Dict[str, str]:
+        verdicts = dict(self.verdicts.get(self.default_locale, {}))
+        verdicts.update(self.verdicts.get(locale, {}))
+        return verdicts
+
+    def locale(self, locale: Optional[str]) -> str:
+        """Поддерживаемый язык или язык по умолчанию."""
+        return locale if locale in self.messages else self.default_locale
+
+    def add_status(self, status: str, verdicts: Dict[str, str]) -> None:
+        """Регистрация своего статуса с вердиктами по языкам.
+
+        Для языков без своего вердикта берется вердикт языка по умолчанию.
+        """
+        for locale, verdict in verdicts.items():
+            self.verdicts.setdefault(locale, {})[status] = verdict
+        self.compile()
+
+    def load(self, path: str) -> None:
+        """Загрузка своих статусов из JSON вида {статус: {язык: вердикт}}."""
+        with open(path, encoding='utf-8') as file:
+            statuses = json.load(file)
+        for status, verdicts in statuses.items():
+            self.add_status(status, verdicts)
+        logger.info('Загружены свои статусы ДЗ: %s', ', '.join(statuses))
+
+    def verdict(self, status: str, locale: Optional[str] = None) -> str:
+        """Вердикт для статуса или сам статус, если он неизвестен."""
+        return self._locale_verdicts(self.locale(locale)).get(status, status)
+
+    def render(
+        self, homework_name: str, status: str, locale: Optional[str] = None
+    ) -> str:
+        """Сообщение о смене статуса ДЗ на языке чата."""
+        return self._render(self.locale(locale), status, homework_name)
+
+    def _render_uncached(
+        self, locale: str, status: str, homework_name: str
+    ) -> str:
+        parts = self._compiled.get((locale, status))
+        if parts is None:
+            raise NotImplementedStatusException(
+                'Неизвестный статус ДЗ в ответе API.'
+                f'Статус ДЗ на сервере: {status}'
+            )
+        prefix, suffix = parts
+        return prefix + homework_name + suffix
+
+
+TEMPLATES = TemplateRegistry()
+
+
+def load_custom_statuses(path: str = CUSTOM_STATUSES_FILE) -> None:
+    """Загрузка своих статусов, если файл существует."""
+    if os.path.exists(path):
+        TEMPLATES.load(path)
@@ -0,0 +1,33 @@
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from utils import FakeClock
+
+
+def test_breaker_opens_after_threshold_and_probes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        failure_threshold=2, base_timeout=10, max_timeout=100, jitter=0,
+        clock=clock
+    )
+    assert not breaker.record_failure()
+    assert breaker.record_failure(), (
+        'Проверьте, что выключатель размыкается после порога ошибок'
+    )
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow(), (
+        'Проверьте, что в полуоткрытом состоянии выполняется один запрос'
+    )
+    assert not breaker.record_failure()
+    assert breaker.retry_in() == 20, (
+        'Проверьте, что задержка растет экспоненциально'
+    )
+
+    clock.now = 30
+    assert breaker.allow()
+    assert breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
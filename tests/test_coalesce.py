@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from coalesce import SingleFlight
+
+
+def test_concurrent_calls_share_one_request():
+    calls = []
+
+    async def request():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'homeworks': []}
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(
+            *(flight.do(('token', 1), request) for _ in range(5))
+        )
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert len(calls) == 1, (
+        'Проверьте, что одновременные одинаковые запросы объединяются'
+    )
+    assert all(result is results[0] for result in results)
+    assert len(flight) == 0, (
+        'Проверьте, что завершенный запрос удаляется из ожидающих'
+    )
+
+
+def test_error_is_shared_and_not_cached():
+    calls = []
+
+    async def request():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError('down')
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(
+            flight.do('key', request),
+            flight.do('key', request),
+            return_exceptions=True
+        )
+        with pytest.raises(ValueError):
+            await flight.do('key', request)
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(calls) == 2, (
+        'Проверьте, что ошибка не сохраняется для следующих запросов'
+    )
@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+
+import commands
+from state import MemoryStateStore
+
+
+def test_status_is_answered_from_store():
+    store = MemoryStateStore()
+    store.set_status('1:a', 'hw1', 'approved')
+    store.set_status('1:b', 'hw2', 'reviewing')
+    command = commands.StatusCommand(
+        store, lambda chat_id: ['1:a', '1:b'] if chat_id == 1 else []
+    )
+    replies = []
+    update = SimpleNamespace(
+        effective_chat=SimpleNamespace(id=1),
+        effective_message=SimpleNamespace(reply_text=replies.append)
+    )
+    command(update, None)
+    assert replies == [
+        '"hw1": Работа проверена: ревьюеру всё понравилось. Ура!\n'
+        '"hw2": Работа взята на проверку ревьюером.'
+    ], 'Проверьте, что /status отвечает статусами из хранилища'
+    assert command.reply(2) == commands.NOT_SUBSCRIBED_MESSAGE
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SETTINGS = ('CLOCK_SKEW', 'STATE_BACKEND', 'PRACT_TOKEN')
+PRINT_SETTINGS = (
+    'import sys, homework, state; '
+    'print(homework.CLOCK_SKEW, state.STATE_BACKEND, '
+    'homework.PRACTICUM_TOKEN, "dotenv" in sys.modules)'
+)
+
+
+def run_with_env_file(tmp_path, code):
+    env_file = tmp_path / '.env'
+    env_file.write_text(
+        'CLOCK_SKEW=5\nSTATE_BACKEND=memory\nPRACT_TOKEN=token\n',
+        encoding='utf-8'
+    )
+    environ = {
+        name: value for name, value in os.environ.items()
+        if name not in SETTINGS
+    }
+    environ['ENV_FILE'] = str(env_file)
+    return subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT,
+        env=environ,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True
+    ).stdout.split()
+
+
+def test_import_does_not_read_env_file(tmp_path):
+    assert run_with_env_file(tmp_path, PRINT_SETTINGS) == [
+        '60', 'sqlite', 'None', 'False'
+    ], 'Проверьте, что импорт модулей не читает .env'
+
+
+def test_scripts_read_module_settings_from_env_file(tmp_path):
+    script = os.path.join(ROOT, 'engine.py')
+    code = (
+        f'import sys; sys.modules["__main__"].__file__ = {script!r}; '
+        + PRINT_SETTINGS
+    )
+    assert run_with_env_file(tmp_path, code) == [
+        '5', 'memory', 'token', 'True'
+    ], 'Проверьте, что скрипты читают настройки модулей из .env'
@@ -0,0 +1,16 @@
+import time
+
+import homework
+
+
+def test_next_from_date_uses_server_date():
+    now = int(time.time())
+    assert homework.next_from_date({'current_date': now}, now - 10) == now, (
+        'Проверьте, что следующая отметка берется из `current_date`'
+    )
+
+
+def test_next_from_date_never_goes_back():
+    now = int(time.time())
+    assert homework.next_from_date({'current_date': now - 10}, now) == now
+    assert homework.next_from_date({'homeworks': []}, now) == now
@@ -0,0 +1,43 @@
+import pytest
+
+import decoder
+from records import Homework, HomeworkStatus
+from exceptions import (
+    HomeworksKeyNotFoundException,
+    NameKeyError,
+    NotListTypeError,
+    StatusKeyError
+)
+
+BODY = (
+    b'{"homeworks": [{"id": 1, "homework_name": "hw", "status": "approved",'
+    b' "reviewer_comment": "ok"}], "current_date": 5}'
+)
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_parse_answer(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(decoder, 'orjson', None)
+    answer = decoder.parse_answer(BODY)
+    assert answer == decoder.Answer([Homework('hw', 'approved')], 5), (
+        'Проверьте, что из ответа остаются только название и статус ДЗ'
+    )
+    assert answer.homeworks[0].status is HomeworkStatus.APPROVED
+
+
+@pytest.mark.parametrize('body, error', [
+    (b'[]', NotListTypeError),
+    (b'{"current_date": 1}', HomeworksKeyNotFoundException),
+    (b'{"homeworks": {}}', NotListTypeError),
+    (b'{"homeworks": [{"homework_name": "hw"}]}', StatusKeyError),
+    (b'{"homeworks": [{"status": "approved"}]}', NameKeyError),
+])
+def test_parse_answer_keeps_exceptions(body, error):
+    with pytest.raises(error):
+        decoder.parse_answer(body)
+
+
+def test_invalid_current_date_is_dropped():
+    answer = decoder.parse_answer(b'{"homeworks": [], "current_date": "1"}')
+    assert answer.current_date is None
@@ -0,0 +1,85 @@
+import asyncio
+
+import engine
+from dedup import SeenSet, error_fingerprint, status_fingerprint
+from exceptions import EndpointUnavailableError, ServerError
+from records import Homework, HomeworkStatus
+from utils import FakeClock
+
+
+def test_seen_set_expires_after_ttl():
+    clock = FakeClock()
+    seen = SeenSet(ttl=10, clock=clock)
+    key = status_fingerprint('1:abc', 'hw', 'approved')
+    assert not seen.seen(key)
+    clock.now = 9
+    assert seen.seen(key), 'Проверьте, что повтор в пределах ttl подавляется'
+    clock.now = 10
+    assert not seen.seen(key), 'Проверьте, что после ttl событие новое'
+
+
+def test_seen_set_is_bounded():
+    seen = SeenSet(ttl=100, max_entries=2)
+    for name in ('hw1', 'hw2', 'hw1', 'hw3'):
+        seen.seen(status_fingerprint('1:abc', name, 'reviewing'))
+    assert len(seen) == 2
+    assert seen.seen(status_fingerprint('1:abc', 'hw1', 'reviewing'))
+    assert not seen.seen(status_fingerprint('1:abc', 'hw2', 'reviewing')), (
+        'Проверьте, что вытесняется запись, которая дольше не встречалась'
+    )
+
+
+def test_error_fingerprint_ignores_message():
+    first = ServerError('Ответ сервера: 404. Время: 1')
+    second = ServerError('Ответ сервера: 404. Время: 2')
+    assert error_fingerprint('1:abc', first) == error_fingerprint(
+        '1:abc', second
+    )
+    assert error_fingerprint('1:abc', first) != error_fingerprint(
+        '1:abc', EndpointUnavailableError('503')
+    )
+    assert error_fingerprint('1:abc', first) != error_fingerprint(
+        '2:abc', first
+    )
+
+
+def test_engine_does_not_renotify_flapping_status():
+    subscription = engine.Subscription('token', 1)
+    polling = engine.PollingEngine(None, [subscription], concurrency=1)
+    statuses = (
+        HomeworkStatus.REVIEWING,
+        HomeworkStatus.REJECTED,
+        HomeworkStatus.REVIEWING,
+    )
+
+    async def flap():
+        for status in statuses:
+            await polling.notify_changes(subscription, [Homework('hw', status)])
+
+    asyncio.run(flap())
+    assert len(polling.outbox.pending[1]) == 2, (
+        'Проверьте, что возврат к недавнему статусу не уведомляется повторно'
+    )
+    assert polling.store.get_statuses(subscription.id) == {
+        'hw': HomeworkStatus.REVIEWING
+    }
+
+
+def test_engine_sends_varying_errors_once():
+    subscription = engine.Subscription('token', 1)
+    polling = engine.PollingEngine(None, [subscription], concurrency=1)
+    attempts = iter(range(3))
+
+    async def fetch(subscription):
+        raise ServerError(f'Ответ сервера: 404. Попытка {next(attempts)}')
+
+    polling.fetch = fetch
+
+    async def poll():
+        for _ in range(3):
+            await polling.poll_once(subscription)
+
+    asyncio.run(poll())
+    assert len(polling.outbox.pending[1]) == 1, (
+        'Проверьте, что сбой одного класса не рассылается повторно'
+    )
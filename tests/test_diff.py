@@ -0,0 +1,20 @@
+import homework
+
+
+def test_diff_statuses_reports_every_transition():
+    homeworks = [
+        {'homework_name': 'hw1', 'status': 'approved'},
+        {'homework_name': 'hw2', 'status': 'reviewing'},
+        {'homework_name': 'hw3', 'status': 'rejected'},
+    ]
+    statuses = {'hw1': 'reviewing', 'hw2': 'reviewing'}
+    changed = homework.diff_statuses(homeworks, statuses)
+    assert [hw['homework_name'] for hw in changed] == ['hw1', 'hw3'], (
+        'Проверьте, что `diff_statuses` возвращает все работы '
+        'с изменившимся статусом, а не только первую'
+    )
+
+
+def test_diff_statuses_keeps_invalid_homeworks():
+    changed = homework.diff_statuses([{'status': 'approved'}], {})
+    assert changed == [{'status': 'approved'}]
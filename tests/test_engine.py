@@ -0,0 +1,286 @@
+import asyncio
+import json
+import os
+import signal
+
+import requests
+
+import engine
+
+
+class MockResponse:
+    status_code = 200
+
+    def __init__(self, homeworks):
+        self.homeworks = homeworks
+
+    def json(self):
+        return {'homeworks': self.homeworks, 'current_date': 1}
+
+    @property
+    def content(self):
+        return json.dumps(self.json()).encode()
+
+
+class MockBot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+def test_poll_once_uses_subscription_token(monkeypatch):
+    tokens = []
+    mock_message = (
+        'Изменился статус проверки работы "hw". '
+        'Работа проверена: ревьюеру всё понравилось. Ура!'
+    )
+
+    def mock_get(url, headers, params):
+        tokens.append(headers['Authorization'])
+        return MockResponse([{'homework_name': 'hw', 'status': 'approved'}])
+
+    monkeypatch.setattr(requests, 'get', mock_get)
+    bot = MockBot()
+    subscriptions = [
+        engine.Subscription('token1', 1), engine.Subscription('token2', 2)
+    ]
+    polling = engine.PollingEngine(bot, subscriptions, concurrency=2)
+
+    async def poll_all():
+        polling.semaphore = asyncio.Semaphore(2)
+        await asyncio.gather(*(polling.poll_once(s) for s in subscriptions))
+        await asyncio.gather(*(polling.poll_once(s) for s in subscriptions))
+
+    asyncio.run(poll_all())
+    assert sorted(tokens) == ['OAuth token1'] * 2 + ['OAuth token2'] * 2, (
+        'Проверьте, что каждая подписка опрашивает API со своим токеном'
+    )
+    assert polling.outbox.pending == {1: [mock_message], 2: [mock_message]}, (
+        'Проверьте, что повторное сообщение не отправляется'
+    )
+
+
+def test_outage_is_reported_once_per_chat(monkeypatch):
+    def mock_get(url, headers, params):
+        raise requests.ConnectionError('down')
+
+    monkeypatch.setattr(requests, 'get', mock_get)
+    subscriptions = [
+        engine.Subscription(f'token{i}', i % 2) for i in range(10)
+    ]
+    polling = engine.PollingEngine(MockBot(), subscriptions, concurrency=10)
+
+    async def poll_all():
+        polling.semaphore = asyncio.Semaphore(10)
+        return [await polling.poll_once(s) for s in subscriptions]
+
+    results = asyncio.run(poll_all())
+    assert None in results, (
+        'Проверьте, что при разомкнутом выключателе опрос пропускается'
+    )
+    assert polling.outbox.pending == {
+        0: [engine.OUTAGE_MESSAGE], 1: [engine.OUTAGE_MESSAGE]
+    }, 'Проверьте, что о сбое API каждый чат узнает один раз'
+
+
+def test_shared_token_is_polled_once(monkeypatch):
+    tokens = []
+
+    def mock_get(url, headers, params):
+        tokens.append(headers['Authorization'])
+        return MockResponse([{'homework_name': 'hw', 'status': 'approved'}])
+
+    monkeypatch.setattr(requests, 'get', mock_get)
+    subscriptions = [
+        engine.Subscription('token', 1), engine.Subscription('token', 2)
+    ]
+    subscriptions[1].from_date += 100
+    polling = engine.PollingEngine(MockBot(), subscriptions, concurrency=2)
+
+    async def poll_group():
+        polling.semaphore = asyncio.Semaphore(2)
+        return await polling.poll_group(
+            polling.groups[subscriptions[0].token_key]
+        )
+
+    assert asyncio.run(poll_group()) == 2
+    assert tokens == ['OAuth token'], (
+        'Проверьте, что подписки с общим токеном делят один запрос к API'
+    )
+    assert set(polling.outbox.pending) == {1, 2}, (
+        'Проверьте, что ответ API рассылается всем чатам токена'
+    )
+
+
+def test_lazy_bot_is_created_on_first_use():
+    created = []
+
+    def factory():
+        created.append(1)
+        return MockBot()
+
+    bot = engine.LazyBot(factory)
+    assert not created
+    bot.send_message(1, 'text')
+    bot.send_message(2, 'text')
+    assert len(created) == 1 and bot.sent == [(1, 'text'), (2, 'text')]
+
+
+def test_stop_sends_queued_messages_before_exit(monkeypatch):
+    monkeypatch.setattr(
+        requests, 'get', lambda url, headers, params: MockResponse([])
+    )
+    bot = MockBot()
+    polling = engine.PollingEngine(
+        bot, [engine.Subscription('token', 1)], concurrency=2
+    )
+
+    async def run():
+        task = asyncio.ensure_future(polling.run())
+        await asyncio.sleep(0.05)
+        polling.outbox.put(1, 'text')
+        polling.stop()
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(run())
+    assert bot.sent == [(1, 'text')], (
+        'Проверьте, что очередь сообщений отправляется при остановке'
+    )
+
+
+def test_flush_error_does_not_stop_engine(monkeypatch):
+    from tests.test_state import FailingStore
+
+    monkeypatch.setattr(
+        requests, 'get', lambda url, headers, params: MockResponse([])
+    )
+    store = FailingStore()
+    store.flush_interval = 0.01
+    store.set_cursor('1:abc', 100)
+    polling = engine.PollingEngine(
+        MockBot(), [engine.Subscription('token', 1)], concurrency=2,
+        store=store
+    )
+
+    async def run():
+        task = asyncio.ensure_future(polling.run())
+        await asyncio.sleep(0.1)
+        assert not task.done(), (
+            'Проверьте, что ошибка записи состояния не останавливает движок'
+        )
+        polling.stop()
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(run())
+    assert store.failures == 0 and not store._pending
+    assert ('cursor', '1:abc', None, 100) in store.persisted
+
+
+class FailingBot(MockBot):
+
+    def send_message(self, chat_id, text):
+        raise ConnectionError('telegram недоступен')
+
+
+def test_undelivered_messages_are_sent_after_restart(monkeypatch):
+    monkeypatch.setattr(
+        requests, 'get', lambda url, headers, params: MockResponse([])
+    )
+    store = engine.MemoryStateStore()
+
+    async def run(bot):
+        polling = engine.PollingEngine(
+            bot, [engine.Subscription('token', 1)], concurrency=2,
+            store=store
+        )
+        shutdown = polling.shutdown
+        polling.shutdown = lambda background: shutdown(background, 0.2)
+        task = asyncio.ensure_future(polling.run())
+        await asyncio.sleep(0.05)
+        return polling, task
+
+    async def stop_failing():
+        polling, task = await run(FailingBot())
+        polling.outbox.put(1, 'text')
+        polling.stop()
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(stop_failing())
+    assert store.get_undelivered() == {
+        (1, engine.Subscription('token', 1).token_key): ['text']
+    }, (
+        'Проверьте, что неотправленные сообщения сохраняются при остановке'
+    )
+
+    bot = MockBot()
+
+    async def restart():
+        polling, task = await run(bot)
+        await asyncio.sleep(0.1)
+        polling.stop()
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(restart())
+    assert bot.sent == [(1, 'text')], (
+        'Проверьте, что сохраненные сообщения отправляются после запуска'
+    )
+    assert store.get_undelivered() == {}
+
+
+def test_undelivered_messages_of_shared_chat_are_kept_per_shard():
+    store = engine.MemoryStateStore()
+    for token in ('a', 'b'):
+        polling = engine.PollingEngine(
+            None, [engine.Subscription(token, 1)], concurrency=1, store=store
+        )
+        polling.outbox.put(1, f'from {token}')
+        polling.save_undelivered()
+    assert len(store.get_undelivered()) == 2, (
+        'Проверьте, что процессы с общим чатом не затирают очереди друг друга'
+    )
+    for token in ('a', 'b'):
+        polling = engine.PollingEngine(
+            None, [engine.Subscription(token, 1)], concurrency=1, store=store
+        )
+        polling.restore_undelivered()
+        assert dict(polling.outbox.pending) == {1: [f'from {token}']}, (
+            'Проверьте, что сообщения восстанавливает только их процесс'
+        )
+    assert store.get_undelivered() == {}
+
+
+def test_hup_reloads_and_usr1_polls_now(monkeypatch):
+    requests_sent = []
+
+    def mock_get(url, headers, params):
+        requests_sent.append(params)
+        return MockResponse([])
+
+    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(engine, 'SCHEDULER_TICK', 0.01)
+    reloads = []
+    monkeypatch.setattr(
+        engine.homework, 'reload_config', lambda: reloads.append(True)
+    )
+    polling = engine.PollingEngine(
+        MockBot(), [engine.Subscription('token', 1)], concurrency=2
+    )
+
+    async def run():
+        task = asyncio.ensure_future(polling.run())
+        await asyncio.sleep(0.05)
+        requests_sent.clear()
+        os.kill(os.getpid(), signal.SIGUSR1)
+        await asyncio.sleep(0.1)
+        assert requests_sent, 'Проверьте, что SIGUSR1 запускает опрос сразу'
+        os.kill(os.getpid(), signal.SIGHUP)
+        await asyncio.sleep(0.1)
+        assert not task.done(), 'Проверьте, что SIGHUP не останавливает движок'
+        polling.stop()
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(run())
+    assert reloads == [True], 'Проверьте, что SIGHUP перечитывает настройки'
@@ -0,0 +1,34 @@
+import requests
+
+import homework
+import http_client
+
+
+def test_create_session_pool_and_retries():
+    session = http_client.create_session(
+        pool_size=7, connect_timeout=1, read_timeout=2, retries=4
+    )
+    adapter = session.get_adapter(homework.ENDPOINT)
+    assert adapter._pool_maxsize == 7, (
+        'Проверьте, что размер пула соединений задается параметром'
+    )
+    assert adapter.max_retries.total == 4
+    assert session.timeout == (1, 2)
+
+
+def test_get_api_answer_uses_installed_session(monkeypatch):
+    calls = []
+
+    class MockSession:
+        def get(self, **kwargs):
+            calls.append(kwargs)
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b'{"homeworks": [], "current_date": 1}'
+            return response
+
+    monkeypatch.setattr(homework, 'http_session', MockSession())
+    assert homework.get_api_answer(0) == {'homeworks': [], 'current_date': 1}
+    assert calls and calls[0]['params'] == {'from_date': 0}, (
+        'Проверьте, что get_api_answer использует установленную сессию'
+    )
@@ -0,0 +1,34 @@
+import json
+import logging
+
+import logging_setup
+
+
+def test_json_log_has_context_and_is_written_by_listener(tmp_path, capsys):
+    log_file = tmp_path / 'homework.log'
+    root = logging.getLogger()
+    handlers, level = root.handlers, root.level
+    listener = logging_setup.setup_logging('INFO', 'json', str(log_file))
+    try:
+        logging_setup.subscription_var.set('1:abc')
+        logging_setup.cycle_var.set(7)
+        logging.getLogger('test').info('Статус %s', 'approved')
+    finally:
+        listener.stop()
+        root.handlers, root.level = handlers, level
+    record = json.loads(log_file.read_text(encoding='utf-8'))
+    assert record['message'] == 'Статус approved'
+    assert record['subscription_id'] == '1:abc', (
+        'Проверьте, что в запись попадает идентификатор подписки'
+    )
+    assert record['cycle_id'] == 7
+
+
+def test_queue_handler_does_not_format_message():
+    record = logging.LogRecord(
+        'test', logging.INFO, __file__, 1, 'Статус %s', ('approved',), None
+    )
+    prepared = logging_setup.DeferredQueueHandler(None).prepare(record)
+    assert prepared.args == ('approved',), (
+        'Проверьте, что аргументы подставляются в фоновом потоке'
+    )
@@ -0,0 +1,51 @@
+import threading
+import urllib.request
+
+import metrics
+
+
+def test_counter_sums_observations_from_all_threads():
+    counter = metrics.Counter('test_total', 'Тестовый счетчик.', ('kind',))
+
+    def work():
+        for _ in range(1000):
+            counter.inc(('a',))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc(('b',), 2)
+    assert counter.values() == {('a',): 4000, ('b',): 2}, (
+        'Проверьте, что значения суммируются по всем потокам'
+    )
+
+
+def test_histogram_exposition():
+    histogram = metrics.Histogram(
+        'test_seconds', 'Тестовая гистограмма.', ('code',), buckets=(1, 5)
+    )
+    histogram.observe(0.5, ('200',))
+    histogram.observe(1, ('200',))
+    histogram.observe(7, ('200',))
+    assert histogram.samples() == [
+        'test_seconds_bucket{code="200",le="1"} 2',
+        'test_seconds_bucket{code="200",le="5"} 2',
+        'test_seconds_bucket{code="200",le="+Inf"} 3',
+        'test_seconds_sum{code="200"} 8.5',
+        'test_seconds_count{code="200"} 3',
+    ]
+
+
+def test_http_endpoint_serves_registry():
+    metrics.counter('test_scrape_total', 'Проверка сбора.').inc()
+    server = metrics.start_http_server(port=0, host='127.0.0.1')
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics') as r:
+            body = r.read().decode()
+    finally:
+        server.shutdown()
+    assert 'test_scrape_total 1' in body
+    assert '# TYPE practicum_request_seconds histogram' in body
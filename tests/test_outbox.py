@@ -0,0 +1,67 @@
+import asyncio
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from outbox import Outbox, TokenBucket, coalesce
+from utils import FakeClock
+
+
+def deliver_next(outbox):
+    ready_at, _, chat_id = outbox._heap.pop(0)
+    outbox._scheduled.discard(chat_id)
+    asyncio.run(outbox.deliver(chat_id))
+    return ready_at
+
+
+def test_token_bucket_limits_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=1, clock=clock)
+    assert bucket.delay() == 0
+    bucket.take()
+    assert bucket.delay() == 0.5
+    clock.now = 0.5
+    assert bucket.delay() == 0
+
+
+def test_coalesce_respects_message_limit():
+    text, rest = coalesce(['a', 'b', 'x' * 4096])
+    assert text == 'a\n\nb'
+    assert rest == ['x' * 4096]
+
+
+def test_pending_messages_for_chat_are_coalesced():
+    sent = []
+
+    async def send(chat_id, text):
+        sent.append((chat_id, text))
+
+    outbox = Outbox(send)
+    outbox.put(1, 'first')
+    outbox.put(1, 'second')
+    deliver_next(outbox)
+    assert sent == [(1, 'first\n\nsecond')], (
+        'Проверьте, что сообщения одного чата склеиваются в одно'
+    )
+    assert len(outbox) == 0
+
+
+def test_failed_messages_are_kept_for_retry():
+    errors = [RetryAfter(7), NetworkError('down'), BadRequest('chat')]
+
+    async def send(chat_id, text):
+        raise errors.pop(0)
+
+    clock = FakeClock()
+    outbox = Outbox(send, base_backoff=1, clock=clock)
+    outbox.put(1, 'message')
+    deliver_next(outbox)
+    assert outbox.pending[1] == ['message'], (
+        'Проверьте, что сообщение не теряется при RetryAfter'
+    )
+    assert deliver_next(outbox) == 7
+    assert outbox.pending[1] == ['message']
+    assert outbox.attempts[1] == 1
+    deliver_next(outbox)
+    assert len(outbox) == 0, (
+        'Проверьте, что сообщение с BadRequest не повторяется'
+    )
@@ -0,0 +1,87 @@
+import os
+import signal
+import threading
+import time
+
+from profiling import CycleTimer, SamplingProfiler, install_profiler
+
+
+def test_cycle_timer_keeps_last_cycles():
+    timer = CycleTimer(size=2, slow=0)
+    with timer.span('http'):
+        pass
+    assert not timer.cycles, 'Проверьте, что span без цикла не учитывается'
+    for cycle in range(3):
+        timer.start(cycle)
+        with timer.span('http'):
+            time.sleep(0.001)
+        with timer.span('send'):
+            pass
+        with timer.span('send'):
+            pass
+        timer.finish()
+    assert [timing.cycle for timing in timer.cycles] == [1, 2], (
+        'Проверьте, что в буфере остаются только последние циклы'
+    )
+    timing = timer.cycles[-1]
+    assert timing.stages['http'] >= 0.001
+    assert timing.total >= timing.stages['http']
+    assert set(timer.summary()) == {'total', 'http', 'send'}
+
+
+def test_span_in_other_thread_is_ignored():
+    timer = CycleTimer(slow=0)
+    timer.start(1)
+
+    def worker():
+        with timer.span('http'):
+            pass
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert timer.finish().stages == {}
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+
+def test_profiler_dumps_folded_stacks(tmp_path):
+    profiler = SamplingProfiler(interval=0.001, directory=str(tmp_path))
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_loop, args=(stop,), name='busy')
+    thread.start()
+    try:
+        profiler.toggle()
+        time.sleep(0.05)
+        profiler.toggle()
+        profiler.join()
+    finally:
+        stop.set()
+        thread.join()
+    assert not profiler.running
+    with open(profiler.path, encoding='utf-8') as file:
+        lines = file.read().splitlines()
+    stacks = [line.rsplit(' ', 1) for line in lines]
+    assert all(count.isdigit() for _, count in stacks)
+    assert any(
+        stack.startswith('busy;') and 'busy_loop (test_profiling.py' in stack
+        for stack, _ in stacks
+    ), 'Проверьте, что стеки пишутся в свернутом формате flamegraph'
+
+
+def test_signal_toggles_profiler(tmp_path):
+    previous = signal.getsignal(signal.SIGUSR2)
+    try:
+        profiler = install_profiler('SIGUSR2')
+        profiler.directory = str(tmp_path)
+        os.kill(os.getpid(), signal.SIGUSR2)
+        assert profiler.running
+        os.kill(os.getpid(), signal.SIGUSR2)
+        profiler.join()
+    finally:
+        signal.signal(signal.SIGUSR2, previous)
+    assert os.listdir(str(tmp_path)) == [os.path.basename(profiler.path)]
+    assert install_profiler('') is None
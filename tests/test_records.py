@@ -0,0 +1,22 @@
+import homework
+from records import Homework, HomeworkStatus, intern_status
+
+
+def test_status_enum_matches_plain_strings():
+    status = intern_status('reviewing')
+    assert status is HomeworkStatus.REVIEWING
+    assert status == 'reviewing' and {'reviewing': 1}[status] == 1, (
+        'Проверьте, что статус сравнивается и хешируется как строка'
+    )
+    assert homework.VERDICTS[status] == homework.VERDICTS['reviewing']
+    assert intern_status('custom') == 'custom'
+
+
+def test_diff_records_returns_events():
+    records = [Homework('a', HomeworkStatus.APPROVED), Homework('b', 'x')]
+    events = homework.diff_records(records, {'a': 'approved', 'b': 'y'})
+    assert [(e.homework.name, e.previous) for e in events] == [('b', 'y')]
+
+
+def test_records_have_no_instance_dict():
+    assert not hasattr(Homework('a', 'approved'), '__dict__')
@@ -0,0 +1,66 @@
+import pytest
+
+import homework
+from benchmarks.replay import (
+    PIPELINES, REDACTED, Recorder, read_corpus, record_tokens, replay
+)
+
+TOKEN = 'secret-practicum-token'
+
+
+def answer(status, current_date):
+    return {
+        'homeworks': [
+            {'homework_name': f'{TOKEN}__hw01.zip', 'status': status},
+            {'homework_name': 'hw02.zip', 'status': 'reviewing'},
+        ],
+        'current_date': current_date,
+    }
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    answers = iter([
+        answer('reviewing', 100),
+        answer('reviewing', 200),
+        answer('approved', 300),
+    ])
+    requests = []
+
+    def request_homework_statuses(token, from_date):
+        requests.append(from_date)
+        return next(answers)
+
+    monkeypatch.setattr(
+        homework, 'request_homework_statuses', request_homework_statuses
+    )
+    monkeypatch.setattr(homework.time, 'time', lambda: 300)
+    path = str(tmp_path / 'corpus.jsonl.gz')
+    with Recorder(path) as recorder:
+        record_tokens(recorder, [TOKEN], cycles=3, interval=0)
+    assert requests == [0, 100, 200], (
+        'Проверьте, что запись сдвигает отметку опроса по current_date'
+    )
+    return path
+
+
+def test_recorder_redacts_tokens(corpus):
+    lines = list(read_corpus(corpus))
+    assert len(lines) == 3
+    assert not any(TOKEN in line for line in lines), (
+        'Проверьте, что токены не попадают в корпус'
+    )
+    assert REDACTED in lines[0]
+
+
+@pytest.mark.parametrize('pipeline', sorted(PIPELINES))
+def test_replay_reports_stages(corpus, pipeline):
+    driver = replay(corpus, pipeline, repeat=2, allocations=True)
+    assert driver.errors == 0
+    assert driver.messages == 2 * 3, (
+        'Проверьте, что повтор корпуса начинается с чистого индекса статусов'
+    )
+    stages = driver.stages
+    assert stages['decode'].items == stages['check'].items == 6
+    assert stages['render'].items == 6
+    assert stages['decode'].allocated > 0
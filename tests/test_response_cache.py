@@ -0,0 +1,77 @@
+import requests
+
+import homework
+from decoder import Answer
+from response_cache import ResponseCache
+
+
+class MockSession:
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, **kwargs):
+        self.calls.append(kwargs)
+        status_code, content, headers = self.responses.pop(0)
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = content
+        response.headers.update(headers)
+        return response
+
+
+def install(monkeypatch, session, cache):
+    monkeypatch.setattr(homework, 'http_session', session)
+    monkeypatch.setattr(homework, 'response_cache', cache)
+
+
+def test_not_modified_reuses_cached_answer(monkeypatch):
+    body = b'{"homeworks": [], "current_date": 1}'
+    session = MockSession(
+        (200, body, {'ETag': '"v1"'}),
+        (304, b'', {'ETag': '"v1"'}),
+    )
+    install(monkeypatch, session, ResponseCache(ttl=0))
+    first = homework.fetch_homework_statuses('token', 0)
+    second = homework.fetch_homework_statuses('token', 1)
+    assert first == (Answer([], 1), True)
+    assert second == (first[0], False), (
+        'Проверьте, что ответ 304 возвращает прошлые данные без изменений'
+    )
+    assert session.calls[1]['headers']['If-None-Match'] == '"v1"', (
+        'Проверьте, что повторный запрос отправляет If-None-Match'
+    )
+    assert 'If-None-Match' not in session.calls[0]['headers']
+
+
+def test_identical_body_is_not_decoded_again(monkeypatch):
+    body = b'{"homeworks": [], "current_date": 1}'
+    session = MockSession((200, body, {}), (200, body, {}))
+    install(monkeypatch, session, ResponseCache(ttl=0))
+    first, _ = homework.fetch_homework_statuses('token', 0)
+    second, modified = homework.fetch_homework_statuses('token', 1)
+    assert second is first and not modified, (
+        'Проверьте, что совпадающее тело ответа не разбирается заново'
+    )
+
+
+def test_fresh_answer_skips_request(monkeypatch):
+    body = b'{"homeworks": [], "current_date": 1}'
+    session = MockSession((200, body, {}))
+    install(monkeypatch, session, ResponseCache(ttl=60))
+    homework.fetch_homework_statuses('token', 5)
+    assert homework.fetch_homework_statuses('token', 5)[1] is False
+    assert len(session.calls) == 1, (
+        'Проверьте, что в пределах ttl запрос не уходит в сеть'
+    )
+
+
+def test_cache_is_bounded():
+    cache = ResponseCache(max_entries=2)
+    for token in ('a', 'b', 'c'):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"homeworks": []}'
+        cache.store(token, 0, response)
+    assert len(cache) == 2 and cache.get('a') is None
@@ -0,0 +1,38 @@
+from scheduler import AdaptiveScheduler
+from utils import FakeClock
+
+
+def make_scheduler(clock):
+    return AdaptiveScheduler(
+        min_interval=60, max_interval=600, backoff=2, jitter=0,
+        initial_interval=120, clock=clock
+    )
+
+
+def test_interval_backs_off_when_idle_and_resets_on_change():
+    scheduler = make_scheduler(FakeClock())
+    scheduler.schedule('a', 'sub', 0)
+    assert scheduler.reschedule('a', changed=False, active=False) == 240
+    assert scheduler.reschedule('a', changed=False, active=False) == 480
+    assert scheduler.reschedule('a', changed=False, active=False) == 600, (
+        'Проверьте, что интервал не превышает максимальный'
+    )
+    assert scheduler.reschedule('a', changed=True, active=False) == 60
+    assert scheduler.reschedule('a', changed=False, active=True) == 60, (
+        'Проверьте, что работы на проверке опрашиваются чаще'
+    )
+
+
+def test_pop_due_returns_only_due_and_skips_stale_entries():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    scheduler.schedule('a', 'sub a', 10)
+    scheduler.schedule('b', 'sub b', 20)
+    scheduler.schedule('a', 'sub a', 30)
+    clock.now = 25
+    assert scheduler.pop_due() == ['sub b']
+    assert scheduler.time_until_next() == 5
+    scheduler.remove('a')
+    clock.now = 40
+    assert scheduler.pop_due() == []
+    assert scheduler.time_until_next() is None
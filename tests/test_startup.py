@@ -0,0 +1,11 @@
+import pytest
+
+from benchmarks.startup import LAZY_MODULES, check_module
+
+
+@pytest.mark.parametrize('module', sorted(LAZY_MODULES))
+def test_heavy_dependencies_are_imported_lazily(module):
+    _, eager = check_module(module, runs=1)
+    assert eager == [], (
+        f'Проверьте, что {module} не импортирует {eager} при загрузке'
+    )
@@ -0,0 +1,190 @@
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+
+import state
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'file'])
+def test_state_survives_restart(tmp_path, backend):
+    path = str(tmp_path / f'state.{backend}')
+    store = state.create_state_store(backend, path)
+    store.set_cursor('1:abc', 100)
+    store.set_status('1:abc', 'hw', 'reviewing')
+    store.set_status('1:abc', 'hw', 'approved')
+    store.set_delivery('1:abc', 'message')
+    store.close()
+
+    store = state.create_state_store(backend, path)
+    assert store.get_cursor('1:abc') == 100, (
+        'Проверьте, что отметка опроса сохраняется между перезапусками'
+    )
+    assert store.get_statuses('1:abc') == {'hw': 'approved'}
+    assert store.get_delivery('1:abc') == 'message'
+    store.close()
+
+
+def test_writes_are_batched(tmp_path):
+    store = state.create_state_store('file', str(tmp_path / 'state.jsonl'))
+    store.flush_interval = 3600
+    store.set_cursor('1:abc', 100)
+    assert not store.flush_due()
+    assert (tmp_path / 'state.jsonl').read_text() == '', (
+        'Проверьте, что запись на диск выполняется только при flush()'
+    )
+    store.flush()
+    assert (tmp_path / 'state.jsonl').read_text() != ''
+    store.close()
+
+
+def test_subscription_id_hides_token():
+    assert 'secret' not in state.subscription_id('secret', 1)
+
+
+class FailingStore(state.MemoryStateStore):
+
+    def __init__(self):
+        super().__init__()
+        self.failures = 1
+        self.persisted = []
+
+    def _persist(self, records):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError('database is locked')
+        self.persisted.extend(records)
+
+
+def test_failed_flush_keeps_records():
+    store = FailingStore()
+    store.set_cursor('1:abc', 100)
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    store.set_cursor('2:abc', 200)
+    store.flush()
+    assert [record[1] for record in store.persisted] == ['1:abc', '2:abc'], (
+        'Проверьте, что пакет, который не удалось записать, не теряется'
+    )
+
+
+def test_writes_during_flush_are_not_lost():
+    class SlowStore(state.MemoryStateStore):
+        persisted = []
+
+        def _persist(self, records):
+            time.sleep(0)
+            self.persisted.extend(records)
+
+    store = SlowStore()
+    flushing = threading.Event()
+
+    def flush_forever():
+        while not flushing.is_set():
+            store.flush()
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    thread = threading.Thread(target=flush_forever)
+    thread.start()
+    try:
+        for from_date in range(2000):
+            store.set_cursor('1:abc', from_date)
+    finally:
+        flushing.set()
+        thread.join()
+        sys.setswitchinterval(interval)
+    store.flush()
+    assert len(store.persisted) == 2000, (
+        'Проверьте, что записи, поставленные во время flush(), сохраняются'
+    )
+
+
+def test_file_log_is_compacted(tmp_path):
+    path = tmp_path / 'state.jsonl'
+    store = state.FileStateStore(str(path), max_bytes=2000)
+    for from_date in range(500):
+        store.set_cursor('1:abc', from_date)
+        store.set_status('1:abc', 'hw', f'status {from_date % 2}')
+        store.flush()
+    assert path.stat().st_size < 4000, (
+        'Проверьте, что журнал сжимается при превышении порога'
+    )
+    store.set_delivery('1:abc', 'message')
+    store.close()
+    assert len(path.read_text().splitlines()) == 3, (
+        'Проверьте, что при закрытии журнал заменяется снимком состояния'
+    )
+
+    store = state.FileStateStore(str(path))
+    assert store.get_cursor('1:abc') == 499
+    assert store.get_statuses('1:abc') == {'hw': 'status 1'}
+    assert store.get_delivery('1:abc') == 'message'
+    store.close()
+    assert not list(tmp_path.glob('.state-*'))
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'file'])
+def test_undelivered_survives_restart(tmp_path, backend):
+    path = str(tmp_path / f'state.{backend}')
+    store = state.create_state_store(backend, path)
+    store.set_undelivered(1, 'a', ['first', 'second'])
+    store.set_undelivered(1, 'b', ['other'])
+    store.close()
+
+    store = state.create_state_store(backend, path)
+    assert store.get_undelivered() == {
+        (1, 'a'): ['first', 'second'], (1, 'b'): ['other']
+    }
+    store.set_undelivered(1, 'a', [])
+    store.close()
+
+    store = state.create_state_store(backend, path)
+    assert store.get_undelivered() == {(1, 'b'): ['other']}
+    store.close()
+
+
+def test_file_log_keeps_records_of_other_processes(tmp_path):
+    path = str(tmp_path / 'state.jsonl')
+    first = state.FileStateStore(path)
+    second = state.FileStateStore(path)
+    first.set_cursor('1:abc', 100)
+    first.flush()
+    second.set_cursor('2:def', 200)
+    second.flush()
+    first.compact()
+    second.set_status('2:def', 'hw', 'approved')
+    second.flush()
+    first.close()
+    second.close()
+
+    store = state.FileStateStore(path)
+    assert store.get_cursor('1:abc') == 100
+    assert store.get_cursor('2:def') == 200, (
+        'Проверьте, что сжатие журнала не теряет записи других процессов'
+    )
+    assert store.get_statuses('2:def') == {'hw': 'approved'}, (
+        'Проверьте, что после сжатия запись идет в новый журнал'
+    )
+    store.close()
+
+
+def test_read_statuses_sees_other_processes(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    poller = state.SQLiteStateStore(path)
+    poller.set_status('1:abc', 'hw', 'reviewing')
+    poller.flush()
+    reader = state.SQLiteStateStore(path)
+    poller.set_status('1:abc', 'hw', 'approved')
+    poller.flush()
+    assert reader.read_statuses('1:abc') == {'hw': 'approved'}, (
+        'Проверьте, что устаревшая копия в памяти не перекрывает базу'
+    )
+    reader.set_status('1:abc', 'other', 'reviewing')
+    assert reader.read_statuses('1:abc') == {
+        'hw': 'approved', 'other': 'reviewing'
+    }
+    poller.close()
+    reader.close()
@@ -0,0 +1,28 @@
+import asyncio
+
+from telegram import Bot
+
+import homework
+from benchmarks.stubs import PracticumStub, TelegramStub
+from engine import PollingEngine, Subscription
+
+
+def test_engine_delivers_changes_through_stubs(monkeypatch):
+    with PracticumStub(churn=1) as practicum, TelegramStub() as telegram:
+        monkeypatch.setattr(homework, 'ENDPOINT', practicum.endpoint)
+        bot = Bot('123:stub', base_url=telegram.base_url)
+        subscriptions = [Subscription('token', 1)]
+        engine = PollingEngine(bot, subscriptions, concurrency=2)
+
+        async def run():
+            engine.semaphore = asyncio.Semaphore(2)
+            await engine.poll_once(subscriptions[0])
+            chat_id = next(iter(engine.outbox.pending))
+            await engine.outbox.deliver(chat_id)
+
+        asyncio.run(run())
+        assert practicum.requests == 1
+        assert [str(chat) for chat, _, _ in telegram.messages] == ['1'], (
+            'Проверьте, что изменение статуса доставлено через заглушки'
+        )
+        assert telegram.latencies(practicum)
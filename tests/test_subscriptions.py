@@ -0,0 +1,115 @@
+import os
+
+import engine
+import subscriptions
+from subscriptions import Subscription, SubscriptionSource
+
+
+def test_load_jsonl_csv_and_sqlite(tmp_path):
+    jsonl = tmp_path / 'subscriptions.jsonl'
+    jsonl.write_text(
+        '{"token": "a", "chat_id": 1}\n\n{"token": "b", "chat_id": 2}\n',
+        encoding='utf-8'
+    )
+    assert [s.chat_id for s in subscriptions.load_subscriptions(
+        str(jsonl)
+    )] == [1, 2]
+    csv_path = tmp_path / 'students.csv'
+    csv_path.write_text(
+        'token,chat_id,locale\nc,3,en\nd,4,\n', encoding='utf-8'
+    )
+    loaded = subscriptions.load_subscriptions(str(csv_path))
+    assert [(s.chat_id, s.locale) for s in loaded] == [(3, 'en'), (4, None)]
+    database = str(tmp_path / 'subscriptions.sqlite3')
+    subscriptions.write_subscriptions(database, loaded)
+    assert [s.id for s in subscriptions.load_subscriptions(database)] == [
+        s.id for s in loaded
+    ], 'Проверьте, что подписки читаются из таблицы SQLite'
+
+
+def test_validation_skips_bad_records():
+    loaded, errors = subscriptions.validate([
+        {'token': 'a', 'chat_id': '1'},
+        {'token': 'a', 'chat_id': 1},
+        {'chat_id': 2},
+        {'token': 'b', 'chat_id': 'x'},
+        {'token': 'c', 'chat_id': 3, 'locale': 'xx'},
+    ])
+    assert [s.chat_id for s in loaded] == [1], (
+        'Проверьте, что повторы и некорректные записи отбрасываются'
+    )
+    assert len(errors) == 3
+
+
+def test_jsonl_records_that_are_not_objects_are_errors(tmp_path):
+    path = tmp_path / 'subscriptions.jsonl'
+    path.write_text(
+        '[1, 2]\n"a"\nnull\n{"token": "a", "chat_id": 1}\n',
+        encoding='utf-8'
+    )
+    loaded, errors = subscriptions.validate(
+        subscriptions.read_jsonl(str(path))
+    )
+    assert [s.chat_id for s in loaded] == [1], (
+        'Проверьте, что записи не-объекты не прерывают загрузку подписок'
+    )
+    assert len(errors) == 3
+
+
+def test_import_merges_into_target(tmp_path):
+    target = str(tmp_path / 'subscriptions.jsonl')
+    source = tmp_path / 'cohort.csv'
+    source.write_text('token,chat_id\na,1\nb,2\n', encoding='utf-8')
+    assert subscriptions.import_subscriptions([str(source)], target) == 2
+    assert subscriptions.import_subscriptions([str(source)], target) == 0
+    assert len(subscriptions.load_subscriptions(target)) == 2
+
+
+def test_reload_applies_only_the_diff(tmp_path):
+    path = str(tmp_path / 'subscriptions.jsonl')
+    subscriptions.write_subscriptions(
+        path, [Subscription('a', 1), Subscription('b', 2)]
+    )
+    source = SubscriptionSource(path)
+    polling = engine.PollingEngine(None, source.load(), concurrency=1)
+    kept = polling.subscriptions[0]
+    kept.from_date = 12345
+    assert not source.changed()
+    subscriptions.write_subscriptions(
+        path, [Subscription('a', 1), Subscription('a', 3, 'en')]
+    )
+    os.utime(path, ns=(0, 0))
+    assert source.changed()
+    assert polling.apply(source.load()) == (1, 1)
+    assert polling.subscriptions[0] is kept and kept.from_date == 12345, (
+        'Проверьте, что перечитывание не сбрасывает отметку опроса'
+    )
+    group = polling.groups[kept.token_key]
+    assert [s.chat_id for s in group] == [1, 3]
+    assert group[1].from_date == 12345, (
+        'Проверьте, что новая подписка на токен получает отметку группы'
+    )
+    assert len(polling.groups) == 1, (
+        'Проверьте, что группа удаленной подписки снимается с расписания'
+    )
+    assert source.subscription_ids(3) == [group[1].id]
+
+
+def test_env_subscription_checks_tokens(monkeypatch):
+    import homework
+
+    monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'token')
+    monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', 'bot')
+    monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '12345')
+    loaded = subscriptions.env_subscriptions()
+    polling = engine.PollingEngine(None, loaded, concurrency=1)
+    assert polling.subscription_ids(12345) == [loaded[0].id], (
+        'Проверьте, что CHAT_ID из окружения приводится к числу'
+    )
+    monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', 'chat')
+    assert subscriptions.env_subscriptions() == []
+    monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '12345')
+    monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', None)
+    assert subscriptions.env_subscriptions() == [], (
+        'Проверьте, что подписка из окружения требует всех токенов'
+    )
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import supervisor
+
+
+def make_subscriptions(count):
+    return [SimpleNamespace(id=f'{number}:abc') for number in range(count)]
+
+
+def test_every_subscription_has_exactly_one_worker():
+    subscriptions = make_subscriptions(1000)
+    shards = [supervisor.shard(subscriptions, index, 4) for index in range(4)]
+    assigned = [sub.id for part in shards for sub in part]
+    assert sorted(assigned) == sorted(sub.id for sub in subscriptions), (
+        'Проверьте, что каждая подписка обслуживается одним процессом'
+    )
+    assert all(len(part) > 150 for part in shards)
+
+
+def test_adding_worker_moves_about_one_kth():
+    keys = [f'{number}:abc' for number in range(5000)]
+    before = supervisor.HashRing(supervisor.worker_name(i) for i in range(4))
+    after = supervisor.HashRing(supervisor.worker_name(i) for i in range(5))
+    moved = sum(before.node_for(key) != after.node_for(key) for key in keys)
+    assert moved < len(keys) * 0.3, (
+        'Проверьте, что при добавлении процесса переезжает около 1/K подписок'
+    )
+
+
+def test_stop_during_restart_backoff_starts_no_worker(monkeypatch):
+    monkeypatch.setattr(supervisor, 'run_worker', lambda index, count: None)
+    monkeypatch.setattr(supervisor.signal, 'signal', lambda *args: None)
+    manager = supervisor.Supervisor(workers=1)
+    started = []
+    start = manager.start
+
+    def record_start(index):
+        started.append(index)
+        start(index)
+
+    manager.start = record_start
+    monkeypatch.setattr(supervisor.time, 'sleep', manager.stop)
+    manager.run()
+    assert started == [0], (
+        'Проверьте, что после остановки во время паузы процесс '
+        'не перезапускается'
+    )
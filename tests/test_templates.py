@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from exceptions import NotImplementedStatusException
+from records import HomeworkStatus
+from templates import TemplateRegistry
+
+
+def test_render_per_locale():
+    registry = TemplateRegistry()
+    assert registry.render('hw', HomeworkStatus.APPROVED) == (
+        'Изменился статус проверки работы "hw". '
+        'Работа проверена: ревьюеру всё понравилось. Ура!'
+    )
+    assert registry.render('hw', 'rejected', 'en') == (
+        'Homework "hw" status changed. '
+        'Reviewed: the reviewer has some remarks.'
+    )
+    assert registry.render('hw', 'reviewing', 'de') == (
+        registry.render('hw', 'reviewing', 'ru')
+    ), 'Проверьте, что для неизвестного языка берется язык по умолчанию'
+
+
+def test_render_is_cached():
+    registry = TemplateRegistry()
+    first = registry.render('hw', 'approved', 'en')
+    assert registry.render('hw', HomeworkStatus.APPROVED, 'en') is first
+    assert registry._render.cache_info().hits == 1
+
+
+def test_custom_status(tmp_path):
+    registry = TemplateRegistry()
+    with pytest.raises(NotImplementedStatusException):
+        registry.render('hw', 'on_hold')
+    path = tmp_path / 'statuses.json'
+    path.write_text(
+        json.dumps({'on_hold': {'ru': 'Проверка отложена.'}}),
+        encoding='utf-8'
+    )
+    registry.load(str(path))
+    assert registry.render('hw', 'on_hold', 'en') == (
+        'Homework "hw" status changed. Проверка отложена.'
+    ), 'Проверьте, что свой статус без перевода берется из языка по умолчанию'
+    assert TemplateRegistry().verdict('on_hold') == 'on_hold', (
+        'Проверьте, что свои статусы не попадают в другие реестры'
+    )
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import homework
+from exceptions import StatusKeyError
+from state import MemoryStateStore
+from subscriptions import Subscription
+from threaded import ThreadedDriver
+
+
+class MockBot:
+
+    def __init__(self):
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text):
+        with self.lock:
+            self.sent.append((chat_id, text))
+
+
+def answer(status):
+    return {
+        'homeworks': [{'homework_name': 'hw', 'status': status}],
+        'current_date': int(time.time()) + 1,
+    }
+
+
+def test_cycle_polls_subscriptions_in_parallel(monkeypatch):
+    barrier = threading.Barrier(3, timeout=2)
+
+    def request_homework_statuses(token, from_date):
+        barrier.wait()
+        return answer('approved')
+
+    monkeypatch.setattr(
+        homework, 'request_homework_statuses', request_homework_statuses
+    )
+    bot = MockBot()
+    subscriptions = [Subscription(f'token{n}', n) for n in range(3)]
+    store = MemoryStateStore()
+    driver = ThreadedDriver(bot, subscriptions, store, workers=3)
+    driver.run_cycle()
+    driver.run_cycle()
+    assert sorted(chat for chat, _ in bot.sent) == [0, 1, 2], (
+        'Проверьте, что подписки опрашиваются параллельно без повторов'
+    )
+    assert store.get_statuses(subscriptions[0].id) == {'hw': 'approved'}
+    assert store.get_cursor(subscriptions[0].id) > time.time() - 60
+    driver.drain()
+
+
+def test_busy_and_late_tasks_are_not_resubmitted(monkeypatch):
+    release = threading.Event()
+
+    def request_homework_statuses(token, from_date):
+        release.wait(2)
+        return answer('reviewing')
+
+    monkeypatch.setattr(
+        homework, 'request_homework_statuses', request_homework_statuses
+    )
+    subscriptions = [Subscription('token', 1)]
+    driver = ThreadedDriver(
+        MockBot(), subscriptions, MemoryStateStore(), workers=1,
+        deadline=0.05
+    )
+    driver.run_cycle()
+    first = driver.running[subscriptions[0].id]
+    assert not first.done()
+    driver.run_cycle()
+    assert driver.running[subscriptions[0].id] is first, (
+        'Проверьте, что подписка не ставится в очередь, пока идет ее задача'
+    )
+    release.set()
+    assert first.result(2) == 'late'
+    driver.drain()
+
+
+def test_stop_drains_started_tasks(monkeypatch):
+    started = threading.Event()
+
+    def request_homework_statuses(token, from_date):
+        started.set()
+        time.sleep(0.1)
+        return answer('approved')
+
+    monkeypatch.setattr(
+        homework, 'request_homework_statuses', request_homework_statuses
+    )
+    bot = MockBot()
+    store = MemoryStateStore()
+    subscriptions = [Subscription('token1', 1), Subscription('token2', 2)]
+    driver = ThreadedDriver(
+        bot, subscriptions, store, workers=1, retry_time=60
+    )
+    runner = threading.Thread(target=driver.run)
+    runner.start()
+    assert started.wait(1)
+    driver.stop()
+    runner.join(2)
+    assert not runner.is_alive(), 'Проверьте, что SIGTERM прерывает ожидание'
+    assert len(bot.sent) == 1, (
+        'Проверьте, что начатая задача завершается, а новые не начинаются'
+    )
+    assert not store._pending, 'Проверьте, что состояние сброшено при остановке'
+
+
+def test_localized_render_raises_the_same_errors():
+    driver = ThreadedDriver(MockBot(), [], MemoryStateStore(), workers=1)
+    errors = []
+    for locale in (None, 'en'):
+        subscription = Subscription('token', 1, locale)
+        try:
+            driver.render(subscription, {'homework_name': 'hw'})
+        except Exception as error:
+            errors.append(type(error))
+    driver.drain(timeout=0)
+    assert errors == [StatusKeyError, StatusKeyError], (
+        'Проверьте, что ошибки разбора не зависят от языка подписки'
+    )
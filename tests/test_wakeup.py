@@ -0,0 +1,54 @@
+import os
+import signal
+import threading
+import time
+
+from wakeup import REFRESH, RELOAD, STOP, Waker
+
+
+def test_wait_returns_on_timeout_or_wake():
+    waker = Waker()
+    started = time.monotonic()
+    assert waker.wait(0.01) == set()
+    assert time.monotonic() - started >= 0.01
+    timer = threading.Timer(0.01, waker.wake)
+    timer.start()
+    assert waker.wait(5) == {REFRESH}, (
+        'Проверьте, что wake() из другого потока прерывает ожидание'
+    )
+    timer.join()
+
+
+def test_stop_ends_all_following_waits():
+    waker = Waker()
+    waker.wake(RELOAD)
+    assert waker.wait(5) == {RELOAD}
+    waker.stop()
+    assert waker.stopping
+    assert waker.wait(5) == {STOP}
+    assert waker.wait(5) == {STOP}, (
+        'Проверьте, что после остановки ожидание не начинается'
+    )
+
+
+def test_signals_interrupt_wait():
+    waker = Waker()
+    reasons = {'SIGHUP': RELOAD, 'SIGUSR1': REFRESH}
+    previous = {
+        name: signal.getsignal(getattr(signal, name)) for name in reasons
+    }
+    try:
+        waker.install(reasons)
+        timer = threading.Timer(
+            0.01, os.kill, (os.getpid(), signal.SIGHUP)
+        )
+        timer.start()
+        assert waker.wait(5) == {RELOAD}, (
+            'Проверьте, что сигнал прерывает ожидание главного потока'
+        )
+        timer.join()
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert waker.wait(0) == {REFRESH}
+    finally:
+        for name, handler in previous.items():
+            signal.signal(getattr(signal, name), handler)
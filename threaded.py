@@ -0,0 +1,278 @@
+"""Опрос многих подписок синхронными функциями бота в пуле потоков.
+
+Для развертываний, где get_api_answer и send_message встроены в
+синхронный код и движок на asyncio пока не подходит. Каждая подписка
+проверяется теми же функциями homework, что и в main(), параллельно в
+POOL_WORKERS потоках. SIGTERM не прерывает запрос или отправку:
+новые задачи не запускаются, начатые дорабатывают до DRAIN_TIMEOUT,
+после чего состояние сбрасывается на диск.
+
+Запуск:
+    python3 threaded.py
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, List
+
+import config
+import homework
+import metrics
+from decoder import homework_fields
+from dedup import SeenSet, error_fingerprint, status_fingerprint
+from logging_setup import cycle_var, setup_logging, subscription_var
+from profiling import install_profiler
+from state import StateStore, create_state_store
+from subscriptions import (
+    NO_SUBSCRIPTIONS_MESSAGE,
+    SUBSCRIPTIONS_FILE,
+    Subscription,
+    env_subscriptions,
+    load_subscriptions
+)
+from templates import load_custom_statuses
+from wakeup import DRAIN_TIMEOUT, RELOAD, Waker
+
+if TYPE_CHECKING:
+    from telegram import Bot
+
+POOL_WORKERS = int(config.getenv('POOL_WORKERS', 16))
+TASK_DEADLINE = float(config.getenv('TASK_DEADLINE', 120))
+
+TASKS = metrics.counter(
+    'pool_tasks_total', 'Задачи пула потоков по результату.', ('result',)
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadedDriver:
+    """Циклы опроса подписок в пуле потоков.
+
+    Подписка не ставится в очередь повторно, пока не завершилась ее
+    прошлая задача. Задача, не начатая до своего срока, пропускается,
+    а не успевшая завершиться к сроку отмечается в журнале и метрике:
+    прервать поток нельзя, время запроса ограничивают таймауты сессии.
+    """
+
+    def __init__(
+        self,
+        bot: 'Bot',
+        subscriptions: List[Subscription],
+        store: StateStore,
+        workers: int = POOL_WORKERS,
+        deadline: float = TASK_DEADLINE,
+        retry_time: float = homework.RETRY_TIME
+    ) -> None:
+        """Пул на workers потоков, состояние подписок из store."""
+        self.bot = bot
+        self.subscriptions = list(subscriptions)
+        self.store = store
+        self.deadline = deadline
+        self.retry_time = retry_time
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='poll'
+        )
+        self.waker = Waker()
+        self.seen = SeenSet()
+        self.running: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+        self._cycles = itertools.count(1)
+        for subscription in self.subscriptions:
+            self.restore(subscription)
+
+    def restore(self, subscription: Subscription) -> None:
+        """Восстановление отметки опроса и последнего сообщения."""
+        from_date = self.store.get_cursor(subscription.id)
+        if from_date is not None:
+            subscription.from_date = from_date
+        previous_message = self.store.get_delivery(subscription.id)
+        if previous_message is not None:
+            subscription.previous_message = previous_message
+
+    def send(self, subscription: Subscription, message: str) -> None:
+        """Отправка сообщения в чат подписки."""
+        homework.send_chat_message(self.bot, subscription.chat_id, message)
+
+    def render(self, subscription: Subscription, item: dict) -> str:
+        """Сообщение о смене статуса на языке подписки."""
+        if subscription.locale is None:
+            return homework.parse_status(item)
+        name, status = homework_fields(item)
+        return homework.format_status(name, status, subscription.locale)
+
+    def check(self, subscription: Subscription) -> None:
+        """Цикл main() для одной подписки без ожидания."""
+        response = homework.request_homework_statuses(
+            subscription.token, subscription.from_date
+        )
+        new_homework = homework.check_response(response)
+        with self.lock:
+            statuses = dict(self.store.get_statuses(subscription.id))
+        changed = homework.diff_statuses(new_homework, statuses)
+        if not changed:
+            logger.debug('Отсутсвует обновление статуса проверки ДЗ.')
+        for item in changed:
+            message = self.render(subscription, item)
+            key = status_fingerprint(
+                subscription.id, item['homework_name'], item['status']
+            )
+            if not self.seen.seen(key):
+                self.send(subscription, message)
+            with self.lock:
+                self.store.set_status(
+                    subscription.id, item['homework_name'], item['status']
+                )
+        subscription.from_date = homework.next_from_date(
+            response, subscription.from_date
+        )
+        with self.lock:
+            self.store.set_cursor(subscription.id, subscription.from_date)
+
+    def poll(self, subscription: Subscription, deadline: float) -> str:
+        """Задача пула: опрос подписки, если срок еще не прошел."""
+        if self.waker.stopping or time.monotonic() > deadline:
+            TASKS.inc(('skipped',))
+            return 'skipped'
+        subscription_var.set(subscription.id)
+        cycle_var.set(next(self._cycles))
+        current_message = ''
+        result = 'ok'
+        try:
+            self.check(subscription)
+        except Exception as error:
+            result = 'error'
+            logger.error('%s: %s', subscription, error)
+            current_message = f'Сбой в работе программы: {error}'
+            key = error_fingerprint(subscription.id, error)
+            if (
+                current_message != subscription.previous_message
+                and not self.seen.seen(key, 'error')
+            ):
+                self.send(subscription, current_message)
+        subscription.previous_message = current_message
+        with self.lock:
+            self.store.set_delivery(subscription.id, current_message)
+        if time.monotonic() > deadline:
+            result = 'late'
+        TASKS.inc((result,))
+        return result
+
+    def submit(self, deadline: float) -> List[Future]:
+        """Постановка в очередь всех свободных подписок."""
+        self.running = {
+            sub_id: future for sub_id, future in self.running.items()
+            if not future.done()
+        }
+        for subscription in self.subscriptions:
+            if subscription.id in self.running:
+                TASKS.inc(('busy',))
+                continue
+            self.running[subscription.id] = self.executor.submit(
+                self.poll, subscription, deadline
+            )
+        return list(self.running.values())
+
+    def run_cycle(self) -> None:
+        """Один цикл: задачи всех подписок и ожидание до срока."""
+        deadline = time.monotonic() + self.deadline
+        pending = self.submit(deadline)
+        while pending and not self.waker.stopping:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning(
+                    'Не уложились в %s с задач: %s',
+                    self.deadline, len(pending)
+                )
+                break
+            _, pending = wait(pending, timeout=min(remaining, 1))
+        with self.lock:
+            self.store.flush()
+
+    def run(self) -> None:
+        """Циклы опроса до остановки, затем завершение задач."""
+        try:
+            while not self.waker.stopping:
+                self.run_cycle()
+                if RELOAD in self.waker.wait(self.retry_time):
+                    homework.reload_config()
+        finally:
+            self.drain()
+
+    def stop(self, *args) -> None:
+        """Остановка: новые задачи не запускаются."""
+        self.waker.stop()
+
+    def drain(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """Ожидание начатых задач и сброс состояния."""
+        self.waker.stop()
+        pending = [
+            future for future in self.running.values() if not future.done()
+        ]
+        if pending:
+            logger.info('Ожидание задач перед остановкой: %s', len(pending))
+            _, pending = wait(pending, timeout=timeout)
+        if pending:
+            logger.warning(
+                'Не завершено задач при остановке: %s', len(pending)
+            )
+        self.executor.shutdown(wait=False)
+        with self.lock:
+            self.store.close()
+        logger.info('Опрос остановлен')
+
+
+def load(path: str = SUBSCRIPTIONS_FILE) -> List[Subscription]:
+    """Подписки из файла или пара PRACTICUM_TOKEN/TELEGRAM_CHAT_ID."""
+    if os.path.exists(path):
+        return load_subscriptions(path)
+    return env_subscriptions()
+
+
+def main(workers: int = POOL_WORKERS) -> None:
+    """Запуск опроса в пуле потоков до SIGTERM или SIGINT."""
+    homework.init_config()
+    if not homework.TELEGRAM_TOKEN:
+        logger.critical(
+            'Программа принудительно остановлена. '
+            'Отсутствует обязательная переменная окружения.'
+        )
+        exit()
+    subscriptions = load()
+    if not subscriptions:
+        logger.critical(NO_SUBSCRIPTIONS_MESSAGE)
+        exit()
+    load_custom_statuses()
+    from telegram import Bot
+    from telegram.utils.request import Request
+
+    from http_client import create_session
+
+    if metrics.METRICS_PORT:
+        metrics.start_http_server(metrics.METRICS_PORT)
+    homework.set_http_session(create_session(pool_size=workers))
+    bot = Bot(
+        token=homework.TELEGRAM_TOKEN,
+        request=Request(con_pool_size=workers + 4)
+    )
+    driver = ThreadedDriver(
+        bot, subscriptions, create_state_store(), workers=workers
+    )
+    driver.waker.install()
+    install_profiler(timings=None)
+    logger.info(
+        'Опрос в пуле потоков запущен: подписок %s, потоков %s',
+        len(driver.subscriptions), workers
+    )
+    driver.run()
+
+
+if __name__ == '__main__':
+    listener = setup_logging()
+    try:
+        main()
+    finally:
+        listener.stop()
@@ -0,0 +1,80 @@
+"""Прерываемое ожидание между циклами опроса.
+
+Вместо time.sleep цикл ждет Waker. Ожидание прерывается остановкой по
+SIGTERM или SIGINT, перечитыванием настроек по SIGHUP и внеочередной
+проверкой по SIGUSR1 или вызову wake() из другого потока.
+"""
+import queue
+import signal
+from typing import Dict, Optional, Set
+
+import config
+
+DRAIN_TIMEOUT = float(config.getenv('DRAIN_TIMEOUT', 25))
+
+STOP = 'stop'
+RELOAD = 'reload'
+REFRESH = 'refresh'
+SIGNAL_REASONS = {
+    'SIGTERM': STOP,
+    'SIGINT': STOP,
+    'SIGHUP': RELOAD,
+    'SIGUSR1': REFRESH,
+}
+
+
+class Waker:
+    """Ожидание, которое можно прервать сигналом или из другого потока.
+
+    Причины пробуждения передаются через queue.SimpleQueue: ее put()
+    можно вызывать из обработчика сигнала, в отличие от
+    threading.Event.set(), который берет блокировку условия.
+    """
+
+    def __init__(self) -> None:
+        """Ожидание без установленных обработчиков сигналов."""
+        self.stopping = False
+        self.signals: Dict[int, str] = {}
+        self._reasons: queue.SimpleQueue = queue.SimpleQueue()
+
+    def wake(self, reason: str = REFRESH) -> None:
+        """Прерывание текущего или следующего ожидания."""
+        if reason == STOP:
+            self.stopping = True
+        self._reasons.put(reason)
+
+    def stop(self, *args) -> None:
+        """Остановка: текущее и все следующие ожидания завершаются сразу."""
+        self.wake(STOP)
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        """Ожидание timeout секунд или пробуждения.
+
+        Возвращает причины пробуждения, пустое множество по таймауту.
+        """
+        if self.stopping:
+            return {STOP}
+        try:
+            reasons = {self._reasons.get(timeout=timeout)}
+        except queue.Empty:
+            return set()
+        while True:
+            try:
+                reasons.add(self._reasons.get_nowait())
+            except queue.Empty:
+                return reasons
+
+    def handle_signal(self, signum, frame) -> None:
+        """Обработчик установленных сигналов."""
+        self.wake(self.signals.get(signum, REFRESH))
+
+    def install(self, reasons: Dict[str, str] = SIGNAL_REASONS) -> None:
+        """Установка обработчиков сигналов, вызывается из главного потока.
+
+        Сигналы, которых нет на платформе, пропускаются.
+        """
+        for name, reason in reasons.items():
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                self.signals[signum] = reason
+                signal.signal(signum, self.handle_signal)